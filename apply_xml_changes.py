@@ -6,16 +6,73 @@ It is designed to be robust, continuing even if one modification fails.
 """
 
 import argparse
+import heapq
 import logging
 import sys
 import re
 import difflib
 import shutil
-import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List, Dict
+from collections import Counter
 from datetime import datetime
 
+# Prefer lxml's C parser when it is installed; fall back to the standard library otherwise.
+try:
+    from lxml import etree as ET
+    XML_PARSE_OPTIONS = {'huge_tree': True, 'strip_cdata': False}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    XML_PARSE_OPTIONS = {}
+
+# Matches a block wrapped in markdown fences: an opening ``` or ```language line and a
+# closing line that is exactly ```. Group 1 is the code between them (None if there is none).
+_FENCE_RE = re.compile(r'\A\s*```[^\n]*\n(?:(.*?)\n)?[^\S\n]*```\s*\Z', re.DOTALL)
+# Matches a trailing '#' or '//' comment up to the end of its line.
+_COMMENT_RE = re.compile(r'(?:#|//)[^\n]*')
+# REPLACE_FILE refuses to drop more than SHRINK_GUARD_MAX_DROP lines from a file of more than
+# SHRINK_GUARD_MIN_LINES lines, which usually means the model sent a truncated file.
+SHRINK_GUARD_MIN_LINES = 50
+SHRINK_GUARD_MAX_DROP = 50
+# Number of best line-overlap windows that get a full similarity comparison in fuzzy matching.
+FUZZY_MATCH_CANDIDATES = 10
+
+def _count_lines(data) -> int:
+    """
+    Count the lines of a str or bytes object like len(data.splitlines()) does for '\\n'-separated
+    text, without splitting it (or, for bytes, decoding it) first.
+    """
+    newline = b'\n' if isinstance(data, bytes) else '\n'
+    return data.count(newline) + (1 if data and not data.endswith(newline) else 0)
+
+def _normalize_line(line: str) -> str:
+    """Strip the comment and surrounding whitespace from a single line of code."""
+    return _COMMENT_RE.sub('', line).strip()
+
+def _rank_windows_by_line_overlap(old_keys: List[str], keys: List[str], top_k: int) -> List[int]:
+    """
+    Cheaply pre-rank every window of len(old_keys) normalized lines in keys by how many
+    lines it shares with old_keys (multiset intersection), maintained as a rolling count
+    while the window slides. Returns the start indices of the top_k windows in ascending order.
+    """
+    width = len(old_keys)
+    wanted = Counter(old_keys)
+    window = Counter()
+    overlap = 0
+    scores = []
+    for i, key in enumerate(keys):
+        window[key] += 1
+        if window[key] <= wanted[key]:
+            overlap += 1
+        if i >= width:
+            dropped = keys[i - width]
+            if window[dropped] <= wanted[dropped]:
+                overlap -= 1
+            window[dropped] -= 1
+        if i >= width - 1:
+            scores.append(overlap)
+    return sorted(heapq.nlargest(top_k, range(len(scores)), key=scores.__getitem__))
+
 class CodeModificationError(Exception):
     """Custom exception for code modification errors."""
     pass
@@ -68,44 +125,14 @@ class XMLCodeApplier:
         """
         if not content:
             return ""
-        
-        lines = content.strip().split('\n')
-        
-        # Guard against empty content after stripping
-        if not lines or (len(lines) == 1 and lines[0] == ''):
-            return ""
 
-        # Check if the first and last lines are markdown fences
-        # The first line can be ``` or ```language
-        has_opening_fence = lines[0].strip().startswith('```')
-        # The last line must be exactly ```
-        has_closing_fence = lines[-1].strip() == '```'
-
-        if has_opening_fence and has_closing_fence and len(lines) >= 2:
+        match = _FENCE_RE.match(content)
+        if match:
             # If fences are present, return the content between them
-            return '\n'.join(lines[1:-1])
-        else:
-            # Otherwise, assume the entire block is the intended code
-            return '\n'.join(lines)
+            return match.group(1) or ""
+        # Otherwise, assume the entire block is the intended code
+        return content.strip()
         
-    def normalize_code_for_comparison(self, code: str) -> str:
-        """Normalize code for comparison by removing comments and extra whitespace."""
-        lines = []
-        for line in code.split('\n'):
-            line = re.sub(r'#.*$', '', line)
-            line = re.sub(r'//.*$', '', line)
-            stripped = line.strip()
-            if stripped:
-                lines.append(stripped)
-        return '\n'.join(lines)
-    
-    def calculate_similarity(self, text1: str, text2: str) -> float:
-        """Calculate similarity between two text strings."""
-        normalized1 = self.normalize_code_for_comparison(text1)
-        normalized2 = self.normalize_code_for_comparison(text2)
-        matcher = difflib.SequenceMatcher(None, normalized1, normalized2)
-        return matcher.ratio()
-    
     def backup_file(self, file_path: Path) -> Optional[Path]:
         if not self.backup_dir or self.dry_run or not file_path.exists():
             return None
@@ -122,7 +149,7 @@ class XMLCodeApplier:
             logging.warning(f"Could not backup {file_path}: {e}")
             return None
     
-    def apply_create_file(self, mod: ET.Element):
+    def apply_create_file(self, mod: Dict[str, Optional[str]]):
         path_str = mod.get('path')
         if not path_str: raise CodeModificationError("CREATE_FILE missing path attribute")
         
@@ -130,11 +157,10 @@ class XMLCodeApplier:
         if file_path.exists():
             raise CodeModificationError(f"File {path_str} already exists, cannot create.")
 
-        content_elem = mod.find('content')
-        if content_elem is None or not content_elem.text:
+        if not mod.get('content'):
             raise CodeModificationError(f"No <content> tag found for {path_str}")
         
-        content = self.extract_code_from_cdata(content_elem.text)
+        content = self.extract_code_from_cdata(mod['content'])
         
         if self.dry_run:
             logging.info(f"[DRY RUN] Would create file: {path_str} with {len(content)} chars")
@@ -143,7 +169,7 @@ class XMLCodeApplier:
             file_path.write_text(content, encoding='utf-8')
             logging.info(f"Created file: {path_str}")
 
-    def apply_delete_file(self, mod: ET.Element):
+    def apply_delete_file(self, mod: Dict[str, Optional[str]]):
         path_str = mod.get('path')
         if not path_str: raise CodeModificationError("DELETE_FILE missing path attribute")
         
@@ -153,9 +179,7 @@ class XMLCodeApplier:
         if not file_path.is_file():
             raise CodeModificationError(f"Path {path_str} is a directory, not a file.")
 
-        reason_elem = mod.find('reason')
-        reason_text = (reason_elem.text or "") if reason_elem is not None else ""
-        reason = self.extract_code_from_cdata(reason_text).strip() or "No reason provided"
+        reason = self.extract_code_from_cdata(mod.get('reason') or "").strip() or "No reason provided"
         
         if self.dry_run:
             logging.info(f"[DRY RUN] Would delete file: {path_str} (Reason: {reason})")
@@ -164,7 +188,7 @@ class XMLCodeApplier:
             file_path.unlink()
             logging.info(f"Deleted file: {path_str} (Reason: {reason})")
     
-    def apply_replace_file(self, mod: ET.Element):
+    def apply_replace_file(self, mod: Dict[str, Optional[str]]):
         path_str = mod.get('path')
         if not path_str: raise CodeModificationError("REPLACE_FILE missing path attribute")
 
@@ -172,21 +196,17 @@ class XMLCodeApplier:
         if not file_path.exists():
             raise CodeModificationError(f"File {path_str} does not exist, cannot replace.")
         
-        content_elem = mod.find('content')
-        if content_elem is None or not content_elem.text:
+        if not mod.get('content'):
              raise CodeModificationError(f"No <content> tag found for {path_str}")
         
-        new_content = self.extract_code_from_cdata(content_elem.text)
-        existing_content = file_path.read_text(encoding='utf-8')
-        
-        existing_lines = len(existing_content.splitlines())
-        new_lines = len(new_content.splitlines())
-        if existing_lines > 50 and (existing_lines - new_lines) > 50:
+        new_content = self.extract_code_from_cdata(mod['content'])
+        # Count the existing file's lines on its raw bytes, so it never has to be decoded just for this check
+        existing_lines = _count_lines(file_path.read_bytes())
+        new_lines = _count_lines(new_content)
+        if existing_lines > SHRINK_GUARD_MIN_LINES and (existing_lines - new_lines) > SHRINK_GUARD_MAX_DROP:
              raise CodeModificationError(f"Significant size reduction blocked ({existing_lines} -> {new_lines} lines)")
 
-        reason_elem = mod.find('reason')
-        reason_text = (reason_elem.text or "") if reason_elem is not None else ""
-        reason = self.extract_code_from_cdata(reason_text).strip() or "No reason provided"
+        reason = self.extract_code_from_cdata(mod.get('reason') or "").strip() or "No reason provided"
         
         if self.dry_run:
             logging.info(f"[DRY RUN] Would replace file: {path_str} ({existing_lines} -> {new_lines} lines)")
@@ -196,7 +216,7 @@ class XMLCodeApplier:
             logging.info(f"Replaced file: {path_str} ({existing_lines} -> {new_lines} lines)")
         logging.debug(f"Reason: {reason}")
         
-    def apply_replace_section(self, mod: ET.Element):
+    def apply_replace_section(self, mod: Dict[str, Optional[str]]):
         path_str = mod.get('path')
         if not path_str: raise CodeModificationError("REPLACE_SECTION missing path attribute")
 
@@ -204,13 +224,11 @@ class XMLCodeApplier:
         if not file_path.exists():
             raise CodeModificationError(f"File {path_str} does not exist, cannot replace section.")
 
-        old_content_elem = mod.find('old_content')
-        new_content_elem = mod.find('new_content')
-        if old_content_elem is None or not old_content_elem.text: raise CodeModificationError("No old_content found")
-        if new_content_elem is None or not new_content_elem.text: raise CodeModificationError("No new_content found")
+        if not mod.get('old_content'): raise CodeModificationError("No old_content found")
+        if not mod.get('new_content'): raise CodeModificationError("No new_content found")
 
-        old_code = self.extract_code_from_cdata(old_content_elem.text)
-        new_code = self.extract_code_from_cdata(new_content_elem.text)
+        old_code = self.extract_code_from_cdata(mod['old_content'])
+        new_code = self.extract_code_from_cdata(mod['new_content'])
         
         existing_content = file_path.read_text(encoding='utf-8')
         
@@ -226,14 +244,49 @@ class XMLCodeApplier:
 
         old_lines_list = old_code.splitlines()
         existing_lines_list = existing_content.splitlines()
-        best_match_start, best_similarity = -1, 0
+        # Normalize every line once up front; each window's normalized text is then joined from
+        # these lines instead of normalizing a freshly joined section string per window.
+        normalized_old = [_normalize_line(line) for line in old_lines_list]
+        normalized_existing = [_normalize_line(line) for line in existing_lines_list]
+
+        # Windows are scored exactly like the baseline's SequenceMatcher(None, old, window).ratio() on the
+        # normalized code (comments, surrounding whitespace and blank lines dropped). The orientation matters:
+        # with autojunk, a sequence of 200+ characters has its most common characters treated as junk, and
+        # that only applies to the second sequence, so old_code stays the first one and each window the second.
+        # old_code is normalized from its '\n'-separated lines, as the baseline did.
+        old_text = '\n'.join(line for line in map(_normalize_line, old_code.split('\n')) if line)
+        old_counts = Counter(old_text)
+        matcher = difflib.SequenceMatcher(None)
+        matcher.set_seq1(old_text)
+
+        def find_best_window(starts, floor=0):
+            best_start, best_ratio = -1, 0
+            for i in starts:
+                window = '\n'.join(line for line in normalized_existing[i : i + len(old_lines_list)] if line)
+                # Cheap upper bounds first, computed like SequenceMatcher's real_quick_ratio() and quick_ratio()
+                # but without indexing the window: one that cannot reach floor or beat the best so far is skipped.
+                length = len(old_text) + len(window)
+                if length:
+                    bound = 2.0 * min(len(old_text), len(window)) / length
+                    if bound < floor or bound <= best_ratio:
+                        continue
+                    bound = 2.0 * sum((old_counts & Counter(window)).values()) / length
+                    if bound < floor or bound <= best_ratio:
+                        continue
+                matcher.set_seq2(window)
+                similarity = matcher.ratio()
+                if similarity > best_ratio:
+                    best_ratio, best_start = similarity, i
+            return best_start, best_ratio
+
+        # The windows sharing the most lines with old_code usually contain the best match, so they are
+        # scored first. The best of them is a lower bound on the overall best, which lets the scan over every
+        # window skip nearly all others on the upper bounds alone, while still returning exactly the baseline's
+        # result: the first window with the highest similarity.
+        candidates = _rank_windows_by_line_overlap(normalized_old, normalized_existing, FUZZY_MATCH_CANDIDATES)
+        _, floor = find_best_window(candidates)
+        best_match_start, best_similarity = find_best_window(range(len(existing_lines_list) - len(old_lines_list) + 1), floor)
 
-        for i in range(len(existing_lines_list) - len(old_lines_list) + 1):
-            section = '\n'.join(existing_lines_list[i : i + len(old_lines_list)])
-            similarity = self.calculate_similarity(old_code, section)
-            if similarity > best_similarity:
-                best_similarity, best_match_start = similarity, i
-        
         if best_similarity < self.similarity_threshold:
             raise CodeModificationError(f"No matching section found (best similarity: {best_similarity:.2%})")
 
@@ -249,58 +302,78 @@ class XMLCodeApplier:
 
     def apply_modifications_from_xml(self, xml_file: Path) -> Tuple[int, int]:
         """
-        Apply all modifications from an XML file robustly by parsing the document
-        and iterating through modification nodes.
+        Apply all modifications from an XML file robustly. The whole document is parsed
+        before anything is applied, so a malformed file never leaves the codebase half
+        modified; the modification nodes are then processed one by one.
         """
         try:
             # Read the XML file content first
             xml_content = xml_file.read_text(encoding='utf-8')
             # Pre-process the XML content to escape problematic reason tags
             processed_xml_content = self._escape_reason_tags_in_xml_string(xml_content)
-            # Parse the processed XML content
-            root = ET.fromstring(processed_xml_content)
+            # Parse from bytes, since lxml rejects str input with an encoding declaration
+            root = ET.fromstring(processed_xml_content.encode('utf-8'), ET.XMLParser(**XML_PARSE_OPTIONS))
         except ET.ParseError as e:
             # This is a fatal error, if the main XML is malformed, we can't proceed.
             raise CodeModificationError(f"Could not parse XML file {xml_file.name}. It is malformed. Error: {e}")
         except Exception as e:
             raise CodeModificationError(f"Could not read or parse {xml_file.name}: {e}")
 
+        if root.tag != 'modifications':
+            logging.warning(f"Unexpected root element <{root.tag}>, expected <modifications>.")
         modifications = root.findall('modification')
-        
+
         if not modifications:
             logging.warning("No <modification> tags found in XML file.")
             return 0, 0
 
         logging.info(f"Found {len(modifications)} modification block(s) to process.")
-        
+
         for i, mod in enumerate(modifications, 1):
-            try:
-                # 'mod' is already an ET.Element, no need for fromstring
-                mod_type = mod.get('type', 'unknown')
-                path = mod.get('path', 'unknown')
-                logging.info(f"--- Applying modification {i}/{len(modifications)}: {mod_type} on {path} ---")
-
-                if mod_type == 'CREATE_FILE': self.apply_create_file(mod)
-                elif mod_type == 'DELETE_FILE': self.apply_delete_file(mod)
-                elif mod_type == 'REPLACE_FILE': self.apply_replace_file(mod)
-                elif mod_type == 'REPLACE_SECTION': self.apply_replace_section(mod)
-                else: raise CodeModificationError(f"Unknown modification type: {mod_type}")
-                
-                self.applied_modifications.append({'type': mod_type, 'path': path})
-
-            except Exception as e:
-                # This catches logical errors from the apply_* methods
-                mod_type_for_error = mod.get('type', 'unknown')
-                path_for_error = mod.get('path', 'unknown')
-                logging.error(f"Failed to apply modification {i} ({mod_type_for_error} on {path_for_error}): {e}")
-                self.failed_modifications.append({
-                    'type': mod_type_for_error,
-                    'path': path_for_error,
-                    'error': str(e)
-                })
+            self._apply_modification(i, len(modifications), self._extract_fields(mod))
 
         return len(self.applied_modifications), len(self.failed_modifications)
 
+    def _extract_fields(self, mod: ET.Element) -> Dict[str, Optional[str]]:
+        """
+        Flattens a <modification> element into a plain dict in a single pass: its
+        attributes, plus the text of each child element keyed by tag name (the first
+        occurrence wins, matching ElementTree's find()).
+        """
+        fields = dict(mod.attrib)
+        for child in mod:
+            # lxml yields comments and processing instructions as children with non-string tags
+            if isinstance(child.tag, str) and child.tag not in fields:
+                fields[child.tag] = child.text
+        return fields
+
+    def _apply_modification(self, index: int, total: int, fields: Dict[str, Optional[str]]):
+        """Dispatch a single modification (see _extract_fields), recording its success or failure."""
+        mod_type = fields.get('type', 'unknown')
+        path = fields.get('path', 'unknown')
+        dispatch = {
+            'CREATE_FILE': self.apply_create_file,
+            'DELETE_FILE': self.apply_delete_file,
+            'REPLACE_FILE': self.apply_replace_file,
+            'REPLACE_SECTION': self.apply_replace_section,
+        }
+        try:
+            logging.info(f"--- Applying modification {index}/{total}: {mod_type} on {path} ---")
+
+            if mod_type not in dispatch: raise CodeModificationError(f"Unknown modification type: {mod_type}")
+            dispatch[mod_type](fields)
+
+            self.applied_modifications.append({'type': mod_type, 'path': path})
+
+        except Exception as e:
+            # This catches logical errors from the apply_* methods
+            logging.error(f"Failed to apply modification {index} ({mod_type} on {path}): {e}")
+            self.failed_modifications.append({
+                'type': mod_type,
+                'path': path,
+                'error': str(e)
+            })
+
     def generate_report(self) -> str:
         report = ["="*60, "CODE MODIFICATION REPORT", "="*60,
                   f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
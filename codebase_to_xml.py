@@ -6,24 +6,32 @@ This version uses file attributes for metadata and raw code in CDATA for robustn
 
 import argparse
 import logging
+import os
 from pathlib import Path
 import sys
 import fnmatch
-from typing import List, Tuple, Optional
+import functools
+import re
+from typing import Dict, FrozenSet, List, Pattern, Tuple, Optional, Union
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # Configuration
-DEFAULT_EXCLUDES = [
+DEFAULT_EXCLUDES = frozenset([
     '.git', '.vscode', 'node_modules', '__pycache__', 'dist', 'build', 
     '.DS_Store', 'coverage', '.next', 'out', 'logs', '.env', 
     'file_tree.md', '.gitignore', 'codebase.xml', 'modifications.xml', 'backups'
-]
-BINARY_EXTENSIONS = {
+])
+BINARY_EXTENSIONS = frozenset({
     '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.eot', '.ttf', '.woff', 
     '.woff2', '.otf', '.zip', '.gz', '.db', '.exe', '.dll', '.so', '.dylib',
     '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'
-}
-LOCK_FILES = ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml']
+})
+LOCK_FILES = frozenset(['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml'])
+BINARY_SNIFF_SIZE = 8192
+# Number of walk events whose files are loaded in the background ahead of the XML writer.
+READ_AHEAD = 64
 
 LANGUAGE_MAP = {
     '.py': 'python', '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript',
@@ -36,6 +44,16 @@ LANGUAGE_MAP = {
 }
 TREE_CHARS = {"space": "  ", "branch": "|  ", "tee": "├──", "corner": "└──"}
 
+# Compiled form of one .gitignore file: a regex for all patterns, one for directory-only
+# patterns ('build/') that is only tried against directories, and whether a bare '*'
+# ignores everything next to the file.
+GitignoreMatcher = Tuple[Pattern, Optional[Pattern], bool]
+# The .gitignore matchers in effect for a directory, innermost last, paired with their directories.
+GitignoreChain = Tuple[Tuple[GitignoreMatcher, Path], ...]
+
+XML_ATTR_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&apos;'})
+OUTPUT_BUFFER_SIZE = 1 << 20  # 1 MiB
+
 def setup_logging(log_level: str):
     numeric_level = getattr(logging, log_level.upper(), None)
     if not isinstance(numeric_level, int):
@@ -70,61 +88,133 @@ def parse_gitignore(gitignore_path: Path) -> List[str]:
         logging.warning(f"Could not read .gitignore at {gitignore_path}: {e}")
     return patterns
 
-def should_exclude(path: Path, base_exclude: List[str], gitignore_patterns: List[Tuple[str, Path]]) -> bool:
+def compile_gitignore(patterns: List[str]) -> Optional[GitignoreMatcher]:
+    """Combines the glob patterns of one .gitignore into precompiled regexes, or None if there are none."""
+    if not patterns: return None
+    normalized = [os.path.normcase(p) for p in patterns]
+    any_re = re.compile('|'.join(fnmatch.translate(p) for p in normalized))
+    dir_patterns = [p[:-1] for p in normalized if p.endswith('/')]
+    dir_re = re.compile('|'.join(fnmatch.translate(p) for p in dir_patterns)) if dir_patterns else None
+    return any_re, dir_re, '*' in patterns
+
+def load_gitignore_matcher(directory: Path, gitignore_cache: Dict[str, Optional[GitignoreMatcher]]) -> Optional[GitignoreMatcher]:
+    gitignore_file = directory / '.gitignore'
+    key = str(gitignore_file)
+    if key not in gitignore_cache:
+        gitignore_cache[key] = compile_gitignore(parse_gitignore(gitignore_file))
+    return gitignore_cache[key]
+
+def extend_gitignore_chain(directory: Path, parent_chain: GitignoreChain, no_gitignore: bool,
+                           gitignore_cache: Dict[str, Optional[GitignoreMatcher]]) -> Tuple[GitignoreChain, bool]:
+    """
+    Returns the matcher chain for a directory and whether its local .gitignore ignores all of
+    its entries. Directories without a .gitignore share their parent's (immutable) chain.
+    """
+    if no_gitignore: return parent_chain, False
+    matcher = load_gitignore_matcher(directory, gitignore_cache)
+    if not matcher: return parent_chain, False
+    return parent_chain + ((matcher, directory),), matcher[2]
+
+def should_exclude(path: Union[Path, os.DirEntry], base_exclude: FrozenSet[str], gitignore_matchers: GitignoreChain) -> bool:
     path_name = path.name
     if path_name in base_exclude: return True
-    for pattern, gitignore_dir in reversed(gitignore_patterns):
+    name_key = os.path.normcase(path_name)
+    for (any_re, dir_re, _), gitignore_dir in reversed(gitignore_matchers):
         try:
-            rel_path_str = str(path.relative_to(gitignore_dir))
-            if fnmatch.fnmatch(rel_path_str, pattern) or fnmatch.fnmatch(path_name, pattern):
-                return True
-            if pattern.endswith('/') and path.is_dir() and (fnmatch.fnmatch(rel_path_str, pattern[:-1]) or fnmatch.fnmatch(path_name, pattern[:-1])):
-                return True
+            rel_key = os.path.normcase(str(Path(path).relative_to(gitignore_dir)))
         except ValueError:
             continue
+        if any_re.match(rel_key) or any_re.match(name_key):
+            return True
+        if dir_re and path.is_dir() and (dir_re.match(rel_key) or dir_re.match(name_key)):
+            return True
     return False
 
-def get_file_language(file_path: Path) -> str:
-    return LANGUAGE_MAP.get(file_path.suffix.lower(), file_path.suffix.lstrip('.'))
+def scan_sorted(directory: Path) -> List[os.DirEntry]:
+    """Lists a directory with os.scandir, directories first, then case-insensitively by name."""
+    # DirEntry caches the file type reported by the directory listing, so sorting needs no extra stat calls
+    with os.scandir(directory) as it:
+        return sorted(it, key=lambda e: (e.is_file(), e.name.lower()))
+
+@functools.lru_cache(maxsize=None)
+def get_file_language(suffix: str) -> str:
+    return LANGUAGE_MAP.get(suffix.lower(), suffix.lstrip('.'))
 
 def escape_xml_attr(text: str) -> str:
-    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&apos;')
+    return text.translate(XML_ATTR_ESCAPES)
 
 def write_cdata(content: str) -> str:
+    # The terminator almost never occurs in source code; a substring test avoids copying the content
+    if ']]>' not in content:
+        return f"<![CDATA[{content}]]>"
     return f"<![CDATA[{content.replace(']]>', ']]]]><![CDATA[>')}]]>"
 
-def generate_tree_summary_string(root_path: Path, depth: int, all_exclude: List[str], no_gitignore: bool) -> str:
+def load_file_entry(entry: os.DirEntry, max_file_size: int) -> Tuple[os.stat_result, str, Optional[str]]:
+    """
+    Stats and, when eligible, reads a file. Returns its stat result, its status
+    ("ok", "omitted_large", "binary", "lock_file", "empty" or "read_error") and its
+    text content (None unless it was read). Raises OSError if the file cannot be stat'ed.
+    """
+    # The stat is always needed for the size and last_modified attributes
+    file_stat = entry.stat()
+    content = None
+    status = "ok"
+
+    # Cheapest checks first: name-based ones need nothing beyond the directory listing
+    if os.path.splitext(entry.name)[1].lower() in BINARY_EXTENSIONS:
+        status = "binary"
+    elif entry.name in LOCK_FILES:
+        status = "lock_file"
+    elif file_stat.st_size > max_file_size:
+        status = "omitted_large"
+    else:
+        try:
+            with open(entry.path, 'rb') as fh:
+                raw = fh.read()
+            # A NUL byte near the start is a cheap, reliable sign of a binary file
+            if b'\x00' in raw[:BINARY_SNIFF_SIZE]:
+                status = "binary"
+            else:
+                content = raw.decode('utf-8', errors='ignore')
+                # Normalize newlines the way text-mode reads did, but only when needed
+                if '\r' in content:
+                    content = content.replace('\r\n', '\n').replace('\r', '\n')
+                if not content.strip():
+                    status = "empty"
+        except Exception:
+            status = "read_error"
+    return file_stat, status, content
+
+def generate_tree_summary_string(root_path: Path, depth: int, all_exclude: FrozenSet[str], no_gitignore: bool) -> str:
     tree_lines = [f"{root_path.name}/"]
     gitignore_cache = {}
-    def walk(current_path, prefix="", current_depth=0, parent_patterns: Optional[List[Tuple[str, Path]]] = None):
+    def walk(current_path, prefix="", current_depth=0, parent_matchers: GitignoreChain = ()):
         if current_depth >= depth: return
-        gitignore_patterns = list(parent_patterns) if parent_patterns else []
-        if not no_gitignore:
-            gitignore_file = current_path / '.gitignore'
-            if str(gitignore_file) not in gitignore_cache:
-                gitignore_cache[str(gitignore_file)] = parse_gitignore(gitignore_file)
-            new_patterns = gitignore_cache[str(gitignore_file)]
-            gitignore_patterns.extend([(p, current_path) for p in new_patterns])
+        gitignore_matchers, ignores_all = extend_gitignore_chain(current_path, parent_matchers, no_gitignore, gitignore_cache)
+        # A bare '*' excludes every entry, so there is no need to list the directory at all
+        if ignores_all: return
         try:
-            entries = sorted([p for p in current_path.iterdir()], key=lambda p: (p.is_file(), p.name.lower()))
-            filtered_entries = [e for e in entries if not should_exclude(e, all_exclude, gitignore_patterns)]
+            entries = scan_sorted(current_path)
+            filtered_entries = [e for e in entries if not should_exclude(e, all_exclude, gitignore_matchers)]
         except (PermissionError, FileNotFoundError):
             return
         for i, entry in enumerate(filtered_entries):
             connector = TREE_CHARS["corner"] if i == len(filtered_entries) - 1 else TREE_CHARS["tee"]
-            tree_lines.append(f"{prefix}{connector} {entry.name}{'/' if entry.is_dir() else ''}")
-            if entry.is_dir():
+            is_dir = entry.is_dir()
+            tree_lines.append(f"{prefix}{connector} {entry.name}{'/' if is_dir else ''}")
+            if is_dir:
                 new_prefix = prefix + (TREE_CHARS["space"] if i == len(filtered_entries) - 1 else TREE_CHARS["branch"])
-                walk(entry, new_prefix, current_depth + 1, gitignore_patterns)
+                walk(Path(entry.path), new_prefix, current_depth + 1, gitignore_matchers)
     walk(root_path)
     return "\n".join(tree_lines)
 
 def generate_xml_structure(root_path: Path, output_file: str, depth: int, exclude_patterns: List[str], no_gitignore: bool, max_file_size: int):
     root = root_path.resolve()
-    all_exclude = DEFAULT_EXCLUDES + exclude_patterns
+    all_exclude = DEFAULT_EXCLUDES.union(exclude_patterns)
     gitignore_cache = {}
     
-    with open(output_file, 'w', encoding='utf-8') as f:
+    # A large buffer turns the many small element writes into few large write syscalls
+    with open(output_file, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
         f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
         f.write(f'<codebase root="{escape_xml_attr(root.name)}">\n')
         
@@ -139,82 +229,94 @@ def generate_xml_structure(root_path: Path, output_file: str, depth: int, exclud
 
         f.write('  <structure>\n')
 
-        def write_file_element(file_path: Path, indent: str):
+        def write_file_element(entry: os.DirEntry, indent: str, loaded: Future):
+            file_path = Path(entry.path)
             relative_path_str = str(file_path.relative_to(root)).replace("\\", "/")
             try:
-                file_stat = file_path.stat()
+                file_stat, status, content = loaded.result()
+                # Only path and language can contain markup characters; the remaining values are
+                # digits or fixed status keywords and are written without escaping.
                 attrs = {
-                    "path": relative_path_str,
-                    "language": get_file_language(file_path),
+                    "path": escape_xml_attr(relative_path_str),
+                    "language": escape_xml_attr(get_file_language(file_path.suffix)),
                     "size": str(file_stat.st_size),
                     "last_modified": str(int(file_stat.st_mtime))
                 }
-                
-                content = None
-                status = "ok"
-
-                if file_stat.st_size > max_file_size:
-                    status = "omitted_large"
-                elif file_path.suffix.lower() in BINARY_EXTENSIONS:
-                    status = "binary"
-                elif file_path.name in LOCK_FILES:
-                    status = "lock_file"
-                else:
-                    try:
-                        content = file_path.read_text('utf-8', errors='ignore')
-                        if not content.strip():
-                            status = "empty"
-                    except Exception:
-                        status = "read_error"
-                
+
+                has_content = bool(content) and status == "ok"
                 if status != "ok":
                     attrs["status"] = status
+                attrs["lines"] = str(content.count('\n') + 1) if has_content else "0"
 
-                attr_str = " ".join([f'{key}="{escape_xml_attr(value)}"' for key, value in attrs.items()])
-                
-                if content and status == "ok":
-                    attrs["lines"] = str(content.count('\n') + 1)
-                else:
-                    attrs["lines"] = "0"
-                
-                attr_str = " ".join([f'{key}="{escape_xml_attr(value)}"' for key, value in attrs.items()])
-
-                if content and status == "ok":
-                    f.write(f'{indent}<file {attr_str}>\n')
-                    f.write(f"{indent}  {write_cdata(content)}\n")
-                    f.write(f'{indent}</file>\n')
+                attr_str = " ".join(f'{key}="{value}"' for key, value in attrs.items())
+
+                if has_content:
+                    f.write(''.join((f'{indent}<file {attr_str}>\n', f'{indent}  ', write_cdata(content), '\n', f'{indent}</file>\n')))
                 else:
                     f.write(f'{indent}<file {attr_str} />\n')
 
             except OSError as e:
                 f.write(f'{indent}<file path="{escape_xml_attr(relative_path_str)}" status="access_error" />\n')
         
-        def walk_directory(current_path: Path, current_depth: int = 0, parent_patterns: Optional[List[Tuple[str, Path]]] = None, indent: str = "    "):
-            if current_depth >= depth: return
-            gitignore_patterns = list(parent_patterns) if parent_patterns else []
-            if not no_gitignore:
-                gitignore_file = current_path / '.gitignore'
-                if str(gitignore_file) not in gitignore_cache:
-                    gitignore_cache[str(gitignore_file)] = parse_gitignore(gitignore_file)
-                new_patterns = gitignore_cache[str(gitignore_file)]
-                gitignore_patterns.extend([(p, current_path) for p in new_patterns])
-            
+        def list_directory(current_path: Path, current_depth: int, parent_matchers: GitignoreChain) -> Tuple[List[os.DirEntry], GitignoreChain]:
+            """Returns the sorted, non-excluded entries of a directory and the gitignore chain in effect inside it."""
+            if current_depth >= depth: return [], parent_matchers
+            gitignore_matchers, ignores_all = extend_gitignore_chain(current_path, parent_matchers, no_gitignore, gitignore_cache)
+            # A bare '*' excludes every entry, so there is no need to list the directory at all
+            if ignores_all: return [], gitignore_matchers
+
             try:
-                entries = sorted([p for p in current_path.iterdir()], key=lambda p: (p.is_file(), p.name.lower()))
-                filtered_entries = [e for e in entries if not should_exclude(e, all_exclude, gitignore_patterns)]
+                entries = scan_sorted(current_path)
+                filtered_entries = [e for e in entries if not should_exclude(e, all_exclude, gitignore_matchers)]
             except (PermissionError, FileNotFoundError) as e:
                 logging.warning(f"Could not access {current_path}: {e}")
-                return
-            
-            for entry in filtered_entries:
-                if entry.is_dir():
-                    f.write(f'{indent}<directory name="{escape_xml_attr(entry.name)}">\n')
-                    walk_directory(entry, current_depth + 1, gitignore_patterns, indent + "  ")
-                    f.write(f'{indent}</directory>\n')
+                return [], gitignore_matchers
+            return filtered_entries, gitignore_matchers
+
+        def walk_directory():
+            """
+            Yields ('open', entry, indent), ('file', entry, indent) and ('close', entry, indent) events
+            in document order. Uses an explicit stack rather than recursion, so deep trees neither hit
+            the recursion limit nor pay for resuming a chain of nested generators on every event.
+            Excluded directories are never listed.
+            """
+            entries, gitignore_matchers = list_directory(root, 0, ())
+            # Each frame: remaining entries, gitignore chain, depth, indent of the entries, directory entry being walked
+            stack = [(iter(entries), gitignore_matchers, 0, "    ", None)]
+            while stack:
+                remaining, gitignore_matchers, current_depth, indent, directory = stack[-1]
+                entry = next(remaining, None)
+                if entry is None:
+                    stack.pop()
+                    if directory is not None:
+                        yield 'close', directory, indent[:-2]
+                elif entry.is_dir():
+                    yield 'open', entry, indent
+                    child_entries, child_matchers = list_directory(Path(entry.path), current_depth + 1, gitignore_matchers)
+                    stack.append((iter(child_entries), child_matchers, current_depth + 1, indent + "  ", entry))
                 else:
-                    write_file_element(entry, indent)
-        
-        walk_directory(root)
+                    yield 'file', entry, indent
+
+        def read_ahead(events):
+            """Starts loading files on a thread pool up to READ_AHEAD events before they are written."""
+            pending = deque()
+            with ThreadPoolExecutor() as pool:
+                for event in events:
+                    kind, entry, _ = event
+                    loaded = pool.submit(load_file_entry, entry, max_file_size) if kind == 'file' else None
+                    pending.append((event, loaded))
+                    if len(pending) > READ_AHEAD:
+                        yield pending.popleft()
+                while pending:
+                    yield pending.popleft()
+
+        for (kind, entry, indent), loaded in read_ahead(walk_directory()):
+            if kind == 'open':
+                f.write(f'{indent}<directory name="{escape_xml_attr(entry.name)}">\n')
+            elif kind == 'close':
+                f.write(f'{indent}</directory>\n')
+            else:
+                write_file_element(entry, indent, loaded)
         
         f.write('  </structure>\n')
         f.write('</codebase>\n')
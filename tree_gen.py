@@ -1,9 +1,17 @@
-import argparse
 import logging
+import os
+import re
 from pathlib import Path
 import sys
-import fnmatch
-import json 
+import tempfile
+import time
+import types
+import codecs
+import enum
+import functools
+import mmap
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # --- Configuration ---
 # This section defines global constants and settings used throughout the script.
@@ -12,16 +20,99 @@ import json
 
 TREE_CHARS = {"space": "  ", "branch": " | ", "tee": " + ", "corner": " L ", "dir": "d", "file": "f"}
 
-# Default list of directory and file names to exclude from the file tree generation.
+# Default set of directory and file names to exclude from the file tree generation.
 # These are common project-related folders/files that are usually not relevant for a file tree.
-DEFAULT_EXCLUDES = ['.git', '.vscode', 'node_modules', '__pycache__', 'dist', 'build', '.DS_Store', 'coverage', '.next', 'out', 'logs', '.env', 'file_tree.md']
+DEFAULT_EXCLUDES = frozenset(['.git', '.vscode', 'node_modules', '__pycache__', 'dist', 'build', '.DS_Store', 'coverage', '.next', 'out', 'logs', '.env', 'file_tree.md'])
 # A set of file extensions that are typically binary files (images, fonts, archives, databases).
 # Content from these files will be omitted to prevent unreadable characters in the output.
-BINARY_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.eot', '.ttf', '.woff', '.woff2', '.otf', '.zip', '.gz', '.db'}
+BINARY_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.eot', '.ttf', '.woff', '.woff2', '.otf', '.zip', '.gz', '.db'})
 
-# List of common lock files (e.g., from npm, yarn, pnpm).
+# Set of common lock files (e.g., from npm, yarn, pnpm).
 # The content of these files will be specifically omitted or summarized for brevity when smart truncation is enabled.
-LOCK_FILES = ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml']
+LOCK_FILES = frozenset(['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml'])
+
+# Defaults of the command-line arguments, shared by `argparse` and the `parse_plain_arguments` fast path.
+DEFAULT_DEPTH = 16
+DEFAULT_TRUNCATE_LIMIT = 500
+DEFAULT_MAX_FILE_SIZE = 1024 * 512 # 512 KB
+DEFAULT_OUTPUT = "file_tree.md"
+DEFAULT_LOG_LEVEL = "INFO"
+
+# Default number of threads listing directories and reading file contents in parallel (`--jobs`). Both are dominated
+# by syscalls (`scandir`, `stat`, `read`), which release the GIL, so more threads than CPUs still help, especially on cold caches.
+DEFAULT_JOBS = min(32, (os.cpu_count() or 1) * 4)
+
+# Every option of the command line (by its `argparse` destination) with its default value. `parse_arguments` takes
+# each option's default from here and `parse_plain_arguments` returns exactly this set, so an option-free command
+# line always has the same attributes as a parsed one.
+OPTION_DEFAULTS = {
+    'include_file_sizes': False, 'only_summary': False, 'only_content': False, 'no_truncate': False,
+    'truncate_limit': DEFAULT_TRUNCATE_LIMIT, 'max_file_size': DEFAULT_MAX_FILE_SIZE, 'output': DEFAULT_OUTPUT,
+    'exclude': (), 'no_gitignore': False, 'jobs': DEFAULT_JOBS, 'cache': False, 'log_level': DEFAULT_LOG_LEVEL,
+}
+
+# Units for human-readable file sizes, indexed by the power of 1024.
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+# Per-unit %-format templates and divisors, precomputed so formatting a size is a single `%` operation.
+SIZE_FORMATS = tuple(f"%.1f {unit}" for unit in SIZE_UNITS)
+SIZE_DIVISORS = tuple(1 << (10 * index) for index in range(len(SIZE_UNITS)))
+
+# Rows of the `--cache` database that no run has used for this many seconds are deleted when it is closed, so the cache
+# only keeps the files of trees that are still being scanned. A hit refreshes its row at most once per `CACHE_TOUCH_INTERVAL`.
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+CACHE_TOUCH_INTERVAL = 24 * 60 * 60
+# Version of the cache's table layout; a database with another version is emptied and recreated.
+CACHE_SCHEMA_VERSION = 1
+
+# Buffer size for the output file, so the many small tree lines and file blocks reach the disk in large chunks.
+OUTPUT_BUFFER_SIZE = 1 << 20
+# Number of summary lines joined into a single write.
+SUMMARY_BATCH_SIZE = 1000
+
+# Number of leading bytes checked for a NUL byte to recognize binary files that have no known binary extension.
+BINARY_SNIFF_SIZE = 8192
+
+# Files at least this large are memory-mapped when smart truncation is applied, so only their head and tail
+# are ever decoded into Python strings, and the chunk size used to validate and count lines in such a mapping.
+MMAP_MIN_SIZE = 256 * 1024
+MMAP_SCAN_CHUNK = 64 * 1024
+
+# Number of upcoming files whose content is read on the worker pool while earlier files are being written.
+# Each read holds at most `--max-file-size` bytes in memory until its block is written.
+READ_AHEAD = 32
+
+# Files are read front to back exactly once, which is worth telling the kernel (so it reads ahead more
+# aggressively) where the platform supports it (`posix_fadvise` on POSIX, `mmap.madvise` on Python 3.8+).
+HAS_FADVISE = hasattr(os, 'posix_fadvise')
+HAS_MADVISE = hasattr(mmap.mmap, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL')
+
+# Regex flags for compiled glob patterns: match case-insensitively on Windows, like `fnmatch` does.
+GLOB_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+# Case folding applied to literal names and extensions so the set-based fast paths agree with `GLOB_FLAGS`.
+fold_case = str.lower if os.name == 'nt' else str
+
+# Characters that make a gitignore pattern a glob rather than a literal name.
+GLOB_MAGIC = frozenset('*?[\\')
+
+# The compiled rules of a single `.gitignore` file.
+# `names`/`exts` hold the plain-name (e.g., 'temp.txt') and plain-extension (e.g., '*.log', stored as '.log')
+# patterns, which are checked with set lookups and `str.endswith` before any regex is run.
+# `regex` combines every remaining pattern; `dir_names`/`dir_regex` do the same for directory-only patterns.
+# `prune_regex` matches the directories whose whole contents are ignored by a 'foo/**' pattern.
+GitignoreRules = namedtuple('GitignoreRules', ['names', 'exts', 'regex', 'dir_names', 'dir_regex', 'prune_regex'])
+
+# The views written to the output file; by default both the summary and the content view are generated.
+class OutputMode(enum.Flag):
+    SUMMARY = enum.auto()
+    CONTENT = enum.auto()
+
+# An entry collected by `scan_tree`: its tree prefix (including the connector), the `os.DirEntry`,
+# whether it is a directory and, for files, its stat result or the `OSError` raised by `stat`.
+TreeNode = namedtuple('TreeNode', ['prefix', 'entry', 'is_dir', 'stat', 'error'])
+
+# The open `--cache` database (see `open_content_cache`): the `sqlite3` connection and `sqlite3.Error`, which is kept
+# alongside it so the per-file helpers can catch database errors without importing `sqlite3` themselves.
+ContentCache = namedtuple('ContentCache', ['connection', 'error'])
 
 # Mapping of file extensions to markdown language identifiers for syntax highlighting.
 LANGUAGE_MAP = {
@@ -82,6 +173,31 @@ def setup_logging(log_level):
     # stream: Specifies the output stream for log messages (sys.stdout means console).
     logging.basicConfig(level=numeric_level, format='%(levelname)s: %(message)s', stream=sys.stdout)
 
+def parse_plain_arguments(argv):
+    """
+    Fast path for the common invocation with at most the two positional arguments (e.g., `tree_gen.py . 4`).
+
+    Such a command line needs none of `argparse`'s machinery, so it is parsed by hand and the (comparatively
+    slow to import and build) parser is skipped, which matters when the script is run repeatedly from editors
+    or shell loops on small trees.
+
+    Args:
+        argv (list): The command-line arguments, without the program name.
+
+    Returns:
+        types.SimpleNamespace or None: The arguments with every option at its default, or None if the
+                                       command line uses any option (or is invalid) and needs the full parser.
+    """
+    if len(argv) > 2 or any(arg.startswith('-') for arg in argv):
+        return None
+    depth = DEFAULT_DEPTH
+    if len(argv) == 2:
+        try:
+            depth = int(argv[1])
+        except ValueError:
+            return None # Let argparse report the invalid depth.
+    return types.SimpleNamespace(folder_path=argv[0] if argv else ".", depth=depth, **OPTION_DEFAULTS)
+
 def parse_arguments():
     """
     Parses command-line arguments provided to the script.
@@ -89,10 +205,17 @@ def parse_arguments():
     This function defines all the available command-line arguments, their types,
     default values, and help messages. It uses `argparse` to create a robust
     command-line interface for the `tree_gen.py` script.
+    Command lines without any options take the `parse_plain_arguments` fast path instead.
 
     Returns:
         argparse.Namespace: An object containing the parsed arguments as attributes.
     """
+    plain_args = parse_plain_arguments(sys.argv[1:])
+    if plain_args is not None:
+        return plain_args
+
+    import argparse # Only imported when the full parser is actually needed.
+    # Every option below takes its default from `OPTION_DEFAULTS`, which is also what the fast path returns.
     parser = argparse.ArgumentParser(
         description="Generate a file tree with smart content truncation, respecting .gitignore.",
         epilog="""
@@ -117,42 +240,48 @@ Examples:
     parser.add_argument("folder_path", type=str, nargs='?', default=".",
                         help="Path to the root folder from which to generate the tree. Defaults to the current directory ('.').")
     # Positional argument: depth
-    parser.add_argument("depth", type=int, nargs='?', default=16,
+    parser.add_argument("depth", type=int, nargs='?', default=DEFAULT_DEPTH,
                         help="Maximum depth of subdirectories to traverse. Files/directories beyond this depth will not be included. Defaults to 16.")
 
     # Optional argument: --include-file-sizes
-    parser.add_argument("--include-file-sizes", action="store_true",
+    parser.add_argument("--include-file-sizes", action="store_true", default=OPTION_DEFAULTS['include_file_sizes'],
                         help="Include the size of each file in the output (e.g., 'file.txt [1.2 KB]'). By default, file sizes are omitted.")
 
     # Mutually exclusive group for content display options.
     # Only one of these arguments can be used at a time.
     content_display_group = parser.add_mutually_exclusive_group()
     # Optional argument: --only-summary
-    content_display_group.add_argument("--only-summary", action="store_true",
+    content_display_group.add_argument("--only-summary", action="store_true", default=OPTION_DEFAULTS['only_summary'],
                                        help="Only generate the summary file tree (directory and file names), without including any file contents.")
     # Optional argument: --only-content
-    content_display_group.add_argument("--only-content", action="store_true",
+    content_display_group.add_argument("--only-content", action="store_true", default=OPTION_DEFAULTS['only_content'],
                                        help="Only generate the detailed file tree that includes file contents, without the initial summary view.")
     # Optional argument: --no-truncate
-    parser.add_argument("--no-truncate", action="store_true",
+    parser.add_argument("--no-truncate", action="store_true", default=OPTION_DEFAULTS['no_truncate'],
                         help="Do not truncate file content. Include the full content of files up to the `max-file-size` limit. By default, smart truncation is applied.")
 
     # Optional argument: --truncate-limit
-    parser.add_argument("--truncate-limit", type=int, default=500,
+    parser.add_argument("--truncate-limit", type=int, default=OPTION_DEFAULTS['truncate_limit'],
                         help="When smart truncation is enabled, this specifies the number of lines to show from the head and tail of a file. Default: 500 lines (500 from start, 500 from end).")
     # Optional argument: --max-file-size
-    parser.add_argument("--max-file-size", type=int, default=1024 * 512, # 512 KB
+    parser.add_argument("--max-file-size", type=int, default=OPTION_DEFAULTS['max_file_size'],
                         help="Maximum file size (in bytes) for content inclusion. Files larger than this limit will have their content omitted, regardless of truncation settings. Default: 512KB.")
     # Optional argument: --output
-    parser.add_argument("--output", type=str, default="file_tree.md",
+    parser.add_argument("--output", type=str, default=OPTION_DEFAULTS['output'],
                         help="The name of the output file where the generated file tree will be saved. Default: 'file_tree.md'.")
     # Optional argument: --exclude
-    parser.add_argument("--exclude", type=str, nargs='*', default=[],
-                        help="Additional file or directory names to exclude from the tree. These are added to the `DEFAULT_EXCLUDES` list.")
+    parser.add_argument("--exclude", type=str, nargs='*', default=OPTION_DEFAULTS['exclude'],
+                        help="Additional file or directory names to exclude from the tree. These are added to the `DEFAULT_EXCLUDES` set. Glob patterns such as '*.tmp' are also accepted.")
     # Optional argument: --no-gitignore
-    parser.add_argument("--no-gitignore", action="store_true", help="Ignore any `.gitignore` files found in the directory structure. By default, `.gitignore` rules are respected.")
+    parser.add_argument("--no-gitignore", action="store_true", default=OPTION_DEFAULTS['no_gitignore'], help="Ignore any `.gitignore` files found in the directory structure. By default, `.gitignore` rules are respected.")
+    # Optional argument: --jobs
+    parser.add_argument("--jobs", type=int, default=OPTION_DEFAULTS['jobs'],
+                        help=f"Number of threads used to list directories and read file contents in parallel. Default: {DEFAULT_JOBS} (four per CPU, at most 32).")
+    # Optional argument: --cache
+    parser.add_argument("--cache", action="store_true", default=OPTION_DEFAULTS['cache'],
+                        help="Cache file contents between runs (in ~/.cache/file-tree-generator/contents.sqlite), so unchanged files are not read again. Off by default.")
     # Optional argument: --log-level
-    parser.add_argument("--log-level", type=str, default="INFO",
+    parser.add_argument("--log-level", type=str, default=OPTION_DEFAULTS['log_level'],
                         choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Sets the logging verbosity level for the script. Default: INFO.")
 
     return parser.parse_args()
@@ -169,39 +298,330 @@ def get_display_size(size_bytes):
     """
     # If the size is less than 1KB, display in bytes.
     if size_bytes < 1024: return f"{size_bytes} B"
-    # Iterate through units (KB, MB, GB, TB) to find the most appropriate one.
-    for unit in ['KB', 'MB', 'GB', 'TB']:
-        # If the size is less than the next unit (1024 of current unit), format and return.
-        if size_bytes < 1024: return f"{size_bytes:.1f} {unit}"
-        # Otherwise, convert to the next larger unit.
-        size_bytes /= 1024
-    # If the size is extremely large, return in Petabytes.
-    return f"{size_bytes:.1f} PB"
+    # Every unit is 2**10 times the previous one, so the unit index follows directly from the bit length.
+    # This runs once per file in the summary, so the clamp is a comparison rather than a `min` call.
+    unit_index = (size_bytes.bit_length() - 1) // 10
+    if unit_index > 5: unit_index = 5
+    return SIZE_FORMATS[unit_index] % (size_bytes / SIZE_DIVISORS[unit_index])
+
+@functools.lru_cache(maxsize=None)
+def translate_glob(pattern):
+    """
+    Translates a gitignore-style glob pattern into an (unanchored at the start) regular expression.
+
+    Unlike `fnmatch.translate`, wildcards do not cross directory separators:
+    `*` becomes `[^/]*`, `?` becomes `[^/]`, `**/` matches zero or more whole directories and any
+    other `**` matches everything. `[...]` character classes are supported, with `!` for negation.
+
+    Args:
+        pattern (str): The glob pattern to translate (e.g., '*.log', 'docs/**/*.md').
+
+    Returns:
+        str: The regular expression source, anchored at the end with `\\Z`.
+             Results are memoized, since nested `.gitignore` files tend to repeat the same patterns.
+    """
+    i, n = 0, len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            if i < n and pattern[i] == '*':
+                i += 1
+                if i < n and pattern[i] == '/':
+                    i += 1
+                    parts.append('(?:.*/)?')
+                else:
+                    parts.append('.*')
+            else:
+                parts.append('[^/]*')
+        elif c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            # Find the closing bracket; a ']' right after '[' or '[!' is part of the class.
+            j = i
+            if j < n and pattern[j] == '!': j += 1
+            if j < n and pattern[j] == ']': j += 1
+            while j < n and pattern[j] != ']': j += 1
+            if j >= n:
+                # No closing bracket: treat '[' literally.
+                parts.append('\\[')
+            else:
+                parts.append(translate_char_class(pattern[i:j]))
+                i = j + 1
+        else:
+            parts.append(re.escape(c))
+    return ''.join(parts) + r'\Z'
+
+def translate_char_class(body):
+    """
+    Translates the body of a glob character class (the text between the brackets) into a regex class.
+
+    Like `fnmatch.translate`, reversed ranges such as 'z-a' match nothing and are dropped, since they are
+    invalid in a regex; a class left without any character never matches (or, negated, matches any
+    character but the separator).
+
+    Args:
+        body (str): The class body, e.g. 'a-z', '!0-9' or ']-'.
+
+    Returns:
+        str: The regular expression source of the class.
+    """
+    negate = body.startswith('!')
+    if negate: body = body[1:]
+    # Split at the range hyphens; a '-' at the very start or end of the class is a literal.
+    chunks = []
+    start, k = 0, 1
+    while True:
+        k = body.find('-', k)
+        if k < 0: break
+        chunks.append(body[start:k])
+        start, k = k + 1, k + 3
+    if body[start:] or not chunks:
+        chunks.append(body[start:])
+    else:
+        chunks[-1] += '-'
+    # Merge away empty ranges, keeping the characters on either side of them.
+    for k in range(len(chunks) - 1, 0, -1):
+        if chunks[k - 1][-1] > chunks[k][0]:
+            chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+            del chunks[k]
+    # Escape backslashes, literal hyphens and characters that could form nested sets or set operations.
+    chars = '-'.join(re.sub(r'([\\&~|\[-])', r'\\\1', chunk) for chunk in chunks)
+    if not chars:
+        return '[^/]' if negate else '(?!)'
+    if negate:
+        return f'[^{chars}]'
+    if chars.startswith('^'):
+        chars = '\\' + chars
+    return f'[{chars}]'
+
+def compile_patterns(patterns):
+    """
+    Combines a list of glob patterns into a single compiled regular expression.
+
+    Args:
+        patterns (list): The glob patterns (e.g., '*.log', 'temp*') to combine.
+
+    Returns:
+        re.Pattern or None: A regex whose `match()` succeeds if any of the patterns matches the whole
+                            '/'-separated path or name, or None if `patterns` is empty.
+    """
+    if not patterns: return None
+    return compile_pattern_tuple(tuple(patterns))
+
+@functools.lru_cache(maxsize=None)
+def compile_pattern_tuple(patterns):
+    """
+    Memoized worker of `compile_patterns`, keyed by the (hashable) tuple of patterns.
+
+    `.gitignore` files with identical rules (common in monorepos) therefore share one compiled regex
+    for the whole process instead of being translated and compiled again.
+    """
+    # OR-ing the translated globs lets one C-level regex match replace a Python-level loop of
+    # `fnmatch.fnmatch` calls. Matching is case-insensitive where the file system usually is.
+    return re.compile('|'.join(f'(?:{translate_glob(p)})' for p in patterns), GLOB_FLAGS)
+
+def split_literal_patterns(patterns):
+    """
+    Separates plain names and plain extensions from the glob patterns that need a regex.
+
+    A pattern is a plain name if it contains no glob characters and no '/' (e.g., 'temp.txt'), and a
+    plain extension if it is '*.' followed by such a name (e.g., '*.log'). Both only ever match the
+    last component of a path, so they can be answered with a set lookup or `str.endswith`.
+
+    Args:
+        patterns (list): A list of glob pattern strings.
+
+    Returns:
+        tuple: A `(names, exts, regex)` tuple. `names` is a frozenset of plain names, `exts` a tuple of
+               extensions including the leading dot (ready for `str.endswith`), and `regex` the compiled
+               remaining patterns (or None if every pattern was literal).
+    """
+    names, exts, rest = set(), set(), []
+    for pattern in patterns:
+        if '/' in pattern:
+            rest.append(pattern)
+        elif GLOB_MAGIC.isdisjoint(pattern):
+            names.add(fold_case(pattern))
+        elif pattern.startswith('*.') and GLOB_MAGIC.isdisjoint(pattern[2:]):
+            exts.add(fold_case(pattern[1:]))
+        else:
+            rest.append(pattern)
+    return frozenset(names), tuple(exts), compile_patterns(rest)
 
 def parse_gitignore(gitignore_path):
     """
-    Parses a `.gitignore` file and extracts the patterns to be ignored.
+    Parses a `.gitignore` file and compiles its patterns into matchers.
 
     Args:
         gitignore_path (Path): The `pathlib.Path` object pointing to the `.gitignore` file.
 
     Returns:
-        list: A list of strings, where each string is an exclusion pattern from the `.gitignore` file.
-              Returns an empty list if the file does not exist or is empty.
+        GitignoreRules or None: The general patterns (e.g., '*.log') split into plain names, plain extensions
+                                and a combined regex, plus the directory-only patterns ending with '/'
+                                (e.g., 'build/', stored without the slash) split into plain names and a regex.
+                                Patterns ending with '/**' (e.g., 'vendor/**') additionally mark their directory
+                                as pruned, so the walkers never list it. Returns None if the file does not exist or has no patterns.
     """
     # Check if the .gitignore file actually exists.
-    if not gitignore_path.is_file(): return []
-    patterns = []
+    if not gitignore_path.is_file(): return None
+    file_patterns = []
+    dir_patterns = []
     # Open the .gitignore file for reading with UTF-8 encoding.
     with open(gitignore_path, 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip() # Remove leading/trailing whitespace.
             # Ignore empty lines and lines starting with '#' (comments).
-            if line and not line.startswith('#'):
-                patterns.append(line)
-    return patterns
+            if not line or line.startswith('#'):
+                continue
+            # Directory patterns (e.g., 'build/') only ever match directories.
+            if line.endswith('/'):
+                dir_patterns.append(line[:-1])
+            else:
+                file_patterns.append(line)
+    if not file_patterns and not dir_patterns: return None
+    names, exts, regex = split_literal_patterns(file_patterns)
+    # Directory-only extension patterns are rare, so they simply stay in the directory regex.
+    dir_names = frozenset(fold_case(p) for p in dir_patterns if '/' not in p and GLOB_MAGIC.isdisjoint(p))
+    dir_regex = compile_patterns([p for p in dir_patterns if fold_case(p) not in dir_names])
+    # 'foo/**' ignores everything inside 'foo' (but not 'foo' itself), so its contents need not be listed at all.
+    prune_regex = compile_patterns([p[:-3] for p in file_patterns + dir_patterns if p.endswith('/**') and len(p) > 3])
+    return GitignoreRules(names, exts, regex, dir_names, dir_regex, prune_regex)
+
+@functools.lru_cache(maxsize=None)
+def parse_gitignore_cached(gitignore_path, mtime_ns):
+    """
+    Memoized `parse_gitignore`, shared by the summary and the content pass.
+
+    Args:
+        gitignore_path (str): The path of the `.gitignore` file.
+        mtime_ns (int): Its modification time, so a file edited between two runs in the same process is re-parsed.
+
+    Returns:
+        GitignoreRules or None: The result of `parse_gitignore`.
+    """
+    return parse_gitignore(Path(gitignore_path))
+
+def load_gitignore(directory):
+    """
+    Returns the compiled rules of the `.gitignore` file in a directory, parsing each file only once.
+
+    Args:
+        directory (Path): The `pathlib.Path` object of the directory being walked.
+
+    Returns:
+        GitignoreRules or None: The compiled rules, or None if the directory has no (non-empty) `.gitignore`.
+    """
+    gitignore_file = os.path.join(directory, '.gitignore')
+    try:
+        mtime_ns = os.stat(gitignore_file).st_mtime_ns
+    except OSError:
+        return None # No .gitignore in this directory (the common case), so there is nothing to parse.
+    return parse_gitignore_cached(gitignore_file, mtime_ns)
+
+def relative_key(path, gitignore_dir):
+    """
+    Computes the '/'-separated path of a file or directory relative to a `.gitignore` file's directory.
+
+    This is plain string arithmetic rather than `Path.relative_to`, which allocates a new path
+    and signals a mismatch with an exception.
+
+    Args:
+        path (str): The full path of the file or directory.
+        gitignore_dir (str): The directory of the `.gitignore` file, ending with a path separator.
+
+    Returns:
+        str or None: The relative path, or None if `path` is not inside `gitignore_dir`
+                     (meaning the patterns of this .gitignore file do not apply to it).
+    """
+    if not path.startswith(gitignore_dir): return None
+    rel_key = path[len(gitignore_dir):]
+    return rel_key if os.sep == '/' else rel_key.replace(os.sep, '/')
 
-def should_exclude(path, base_exclude, gitignore_patterns):
+def is_pruned(directory, gitignore_patterns):
+    """
+    Determines if the whole contents of a directory are ignored by a `.gitignore` 'foo/**' pattern.
+
+    Such a directory is still shown in the tree, but walking it would only list children that are all
+    excluded afterwards, so the walkers skip it before calling `os.scandir`.
+
+    Args:
+        directory (Path): The `pathlib.Path` object of the directory about to be walked.
+        gitignore_patterns (tuple): The `(GitignoreRules, str)` pairs that apply to the directory's parent.
+
+    Returns:
+        bool: True if the directory's contents are all ignored, False otherwise.
+    """
+    directory_str = str(directory)
+    for rules, gitignore_dir in gitignore_patterns:
+        if not rules.prune_regex: continue
+        # Like the pattern it came from, the prefix only ever matches the path relative to the .gitignore.
+        rel_key = relative_key(directory_str, gitignore_dir)
+        if rel_key is not None and rules.prune_regex.match(rel_key):
+            logging.debug("Skipping directory whose contents are ignored by %s: %s", gitignore_dir, directory)
+            return True
+    return False
+
+def compile_excludes(patterns):
+    """
+    Compiles `DEFAULT_EXCLUDES` and the user-provided `--exclude` patterns into a single name matcher.
+
+    Plain names are kept in a frozenset and plain extension patterns (e.g., '*.tmp') in a tuple for
+    `str.endswith`; these cheap checks run first. Only the remaining glob patterns (e.g., 'cache-?')
+    are translated once and combined into one regex, instead of being re-evaluated per entry.
+
+    Args:
+        patterns (list): The user-provided names or glob patterns to exclude.
+
+    Returns:
+        callable: A function that takes a file or directory name and returns True if it is excluded.
+    """
+    names = set(DEFAULT_EXCLUDES)
+    suffixes = set()
+    globs = []
+    for pattern in patterns:
+        if GLOB_MAGIC.isdisjoint(pattern):
+            names.add(pattern)
+        elif pattern.startswith('*.') and GLOB_MAGIC.isdisjoint(pattern[2:]):
+            # Keep the dot: '*.tmp' matches names ending with '.tmp'. Folded like the regex is (see `GLOB_FLAGS`).
+            suffixes.add(fold_case(pattern[1:]))
+        else:
+            globs.append(pattern)
+    names, suffixes = frozenset(names), tuple(suffixes)
+    regex = compile_patterns(globs)
+    if regex is None and not suffixes:
+        return names.__contains__
+    if regex is None:
+        return lambda name: name in names or fold_case(name).endswith(suffixes)
+    match = regex.match
+    return lambda name: name in names or fold_case(name).endswith(suffixes) or match(name) is not None
+
+def list_entries(directory, exclude_matcher, gitignore_patterns):
+    """
+    Lists the included entries of a directory, directories first and then case-insensitively by name.
+
+    `os.scandir` is used instead of `Path.iterdir` because its `DirEntry` objects cache the file type
+    (and, once requested, the stat result) from the directory read, so sorting and filtering the entries
+    does not cost extra syscalls or one `Path` allocation per child.
+    Excluded entries are dropped before sorting, so they never get a sort key computed
+    (which for a symlink means a `stat`), and ignored bulk such as `node_modules` does not enlarge the sort.
+    The key itself is evaluated once per entry, not per comparison.
+
+    Args:
+        directory (Path): The `pathlib.Path` object of the directory to list.
+        exclude_matcher (callable): The compiled default and user-specified excludes (see `compile_excludes`).
+        gitignore_patterns (tuple): The `(GitignoreRules, str)` pairs that apply to the directory.
+
+    Returns:
+        list: The sorted `os.DirEntry` objects of the entries that are not excluded.
+    """
+    with os.scandir(directory) as it:
+        entries = [e for e in it if not should_exclude(e, exclude_matcher, gitignore_patterns)]
+    entries.sort(key=lambda e: (e.is_file(), e.name.lower()))
+    return entries
+
+def should_exclude(path, exclude_matcher, gitignore_patterns):
     """
     Determines if a given file or directory path should be excluded from the tree.
 
@@ -210,10 +630,11 @@ def should_exclude(path, base_exclude, gitignore_patterns):
     2.  Patterns found in `.gitignore` files relevant to the current path.
 
     Args:
-        path (Path): The `pathlib.Path` object of the file or directory to check.
-        base_exclude (list): A combined list of default and user-specified exclusion patterns.
-        gitignore_patterns (list): A list of tuples, where each tuple contains a `.gitignore` pattern
-                                   and the `pathlib.Path` of the `.gitignore` file it originated from.
+        path (os.DirEntry or Path): The directory entry (or `pathlib.Path` object) of the file or directory to check.
+        exclude_matcher (callable): The compiled default and user-specified excludes (see `compile_excludes`).
+        gitignore_patterns (tuple): A tuple of pairs, where each pair contains the compiled matchers of a
+                                   `.gitignore` file (the `GitignoreRules` returned by `parse_gitignore`) and the path
+                                   of the directory it was found in, as a string ending with a path separator.
                                    This allows for context-aware matching.
 
     Returns:
@@ -222,34 +643,44 @@ def should_exclude(path, base_exclude, gitignore_patterns):
     path_name = path.name # Get just the name of the file or directory (e.g., 'my_folder', 'index.js').
 
     # 1. Check against default and user-provided explicit excludes.
-    if path_name in base_exclude:
-        logging.debug(f"Excluded by default/user pattern: {path_name}")
+    if exclude_matcher(path_name):
+        logging.debug("Excluded by default/user pattern: %s", path_name)
         return True
 
     # 2. Check against .gitignore patterns.
-    # Iterate through gitignore patterns in reverse order to prioritize patterns from closer .gitignore files.
-    for pattern, gitignore_dir in reversed(gitignore_patterns):
-        try:
-            # Calculate the path relative to the .gitignore file's directory.
-            rel_path = path.relative_to(gitignore_dir)
-            
-            # Handle directory patterns that end with a '/' (e.g., 'build/').
-            if pattern.endswith('/'):
-                # For directory patterns, match against the directory's relative path or its name.
-                # `fnmatch.fnmatch` performs shell-style wildcard matching.
-                if path.is_dir() and (fnmatch.fnmatch(str(rel_path), pattern[:-1]) or fnmatch.fnmatch(path_name, pattern[:-1])):
-                    logging.debug(f"Excluded by gitignore directory pattern '{pattern}' from {gitignore_dir}: {path}")
-                    return True
-            else:
-                # For file patterns or general patterns (e.g., '*.log', 'temp*').
-                # Match against the relative path or just the file/directory name.
-                if fnmatch.fnmatch(str(rel_path), pattern) or fnmatch.fnmatch(path_name, pattern):
-                    logging.debug(f"Excluded by gitignore pattern '{pattern}' from {gitignore_dir}: {path}")
-                    return True
-        except ValueError:
-            # This exception occurs if `path` is not a child of `gitignore_dir`,
-            # meaning the current .gitignore pattern does not apply to this path.
+    # Iterate through .gitignore files in reverse order to prioritize patterns from closer .gitignore files.
+    name_key = fold_case(path_name)
+    is_dir = None # Only stat the path if a directory pattern could match it.
+    for rules, gitignore_dir in reversed(gitignore_patterns):
+        # Fast path: plain names and extensions only look at the last path component,
+        # so they need neither the relative path nor a regex match.
+        if name_key in rules.names or (rules.exts and name_key.endswith(rules.exts)):
+            logging.debug("Excluded by gitignore pattern from %s: %s", gitignore_dir, os.fspath(path))
+            return True
+        if name_key in rules.dir_names:
+            if is_dir is None: is_dir = path.is_dir()
+            if is_dir:
+                logging.debug("Excluded by gitignore directory pattern from %s: %s", gitignore_dir, os.fspath(path))
+                return True
+        if not rules.regex and not rules.dir_regex:
+            continue
+
+        # Calculate the path relative to the .gitignore file's directory, always '/'-separated.
+        rel_key = relative_key(os.fspath(path), gitignore_dir)
+        if rel_key is None:
             continue
+
+        # For the remaining glob patterns (e.g., 'temp*', 'docs/*.md').
+        # Match against the relative path or just the file/directory name.
+        if rules.regex and (rules.regex.match(rel_key) or rules.regex.match(path_name)):
+            logging.debug("Excluded by gitignore pattern from %s: %s", gitignore_dir, os.fspath(path))
+            return True
+        # Handle directory patterns that end with a '/' (e.g., 'build/'), which only apply to directories.
+        if rules.dir_regex:
+            if is_dir is None: is_dir = path.is_dir()
+            if is_dir and (rules.dir_regex.match(rel_key) or rules.dir_regex.match(path_name)):
+                logging.debug("Excluded by gitignore directory pattern from %s: %s", gitignore_dir, os.fspath(path))
+                return True
     return False # If no exclusion rule matches, the path is not excluded.
 
 def truncate_content(content, limit, entry):
@@ -265,17 +696,116 @@ def truncate_content(content, limit, entry):
     Returns:
         str: The truncated content string, with an ellipsis marker in the middle if truncation occurred.
     """
-    lines = content.splitlines() # Split the content into individual lines.
+    # Count the lines without splitting the content; a final line without a trailing newline still counts.
+    line_count = content.count('\n') + (1 if content and not content.endswith('\n') else 0)
     # If the total number of lines is less than or equal to twice the limit, no truncation is needed.
-    if len(lines) <= limit * 2:
+    if line_count <= limit * 2:
         return content
-    # Get the first 'limit' lines.
-    head = "\n".join(lines[:limit])
-    # Get the last 'limit' lines.
-    tail = "\n".join(lines[-limit:])
+    # Find the end of the first 'limit' lines by scanning forward for newlines.
+    head_end = -1
+    for _ in range(limit):
+        head_end = content.find('\n', head_end + 1)
+    # Find the start of the last 'limit' lines by scanning backward, ignoring the final trailing newline.
+    tail_end = len(content) - 1 if content.endswith('\n') else len(content)
+    tail_start = tail_end
+    for _ in range(limit):
+        tail_start = content.rfind('\n', 0, tail_start)
     # Print a message indicating how many lines were truncated.
-    print(f"Truncating {len(lines) - (limit * 2)} lines from file {entry.name}")
-    # Return the combined head, truncation marker, and tail.
+    print(f"Truncating {line_count - (limit * 2)} lines from file {entry.name}")
+    # Slice the head and tail straight out of the content and combine them with the truncation marker.
+    return f"{content[:max(head_end, 0)]}\n\n... [content truncated] ...\n\n{content[tail_start + 1:tail_end]}"
+
+def read_file_text(path, max_size, size):
+    """
+    Reads a file as UTF-8 text with a single bounded binary read and one strict decode.
+
+    This skips the incremental decoder of a text-mode file object. Newlines are normalized
+    to '\\n' afterwards, exactly as `read_text` would have done.
+    The file is opened unbuffered and read with one call sized from its stat result, so small files neither
+    allocate an I/O buffer nor pay a second `read` to detect the end of the file. Only a short read (or a
+    file that changed since it was stat'ed) falls back to reading on until the end, up to `max_size` bytes.
+    Files with a NUL byte near the start are reported as binary without attempting the decode, since
+    text files never contain one and binaries (e.g., '.pdf', '.pyc', '.class') nearly always do.
+
+    Args:
+        path (Path): The `pathlib.Path` object of the file to read.
+        max_size (int): The maximum number of bytes to read; the file is known to be no larger.
+        size (int): The size of the file according to its stat result.
+
+    Returns:
+        str or None: The decoded content of the file, or None if the file looks binary.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8.
+        OSError: If the file cannot be opened or read.
+    """
+    with open(path, 'rb', buffering=0) as fh:
+        if HAS_FADVISE: os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        raw = fh.read(size + 1)
+        if len(raw) != size:
+            chunks, total = [raw], len(raw)
+            while total <= max_size:
+                chunk = fh.read(max_size + 1 - total)
+                if not chunk: break
+                chunks.append(chunk)
+                total += len(chunk)
+            raw = b''.join(chunks)
+    if b'\0' in raw[:BINARY_SNIFF_SIZE]: return None
+    content = raw.decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+def truncate_mapped_file(path, limit, entry):
+    """
+    Truncates a large file like `truncate_content`, without reading all of it into a Python string.
+
+    The file is memory-mapped, validated as UTF-8 and its newlines are counted chunk by chunk; only the head
+    and tail lines that end up in the output are decoded. Splitting at b'\\n' is safe because that byte
+    never occurs inside a multi-byte UTF-8 sequence.
+
+    Args:
+        path (Path): The `pathlib.Path` object of the (non-empty) file.
+        limit (int): The number of lines to show from the beginning and end of the file.
+        entry (os.DirEntry): The directory entry of the file (used for printing its name).
+
+    Returns:
+        str or None: The (possibly truncated) content, or None if the file contains carriage returns or looks
+                     binary, in which case the caller should fall back to `read_file_text`, which normalizes
+                     newlines and reports binaries.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8.
+        OSError: If the file cannot be opened or mapped.
+    """
+    with open(path, 'rb', buffering=0) as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if HAS_MADVISE: mm.madvise(mmap.MADV_SEQUENTIAL)
+        size = len(mm)
+        if b'\0' in mm[:BINARY_SNIFF_SIZE]: return None
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        newlines = 0
+        for start in range(0, size, MMAP_SCAN_CHUNK):
+            chunk = mm[start:start + MMAP_SCAN_CHUNK]
+            if b'\r' in chunk: return None
+            decoder.decode(chunk) # Only validates; the decoded chunk is discarded right away.
+            newlines += chunk.count(b'\n')
+        decoder.decode(b'', final=True)
+
+        ends_with_newline = mm[size - 1] == ord('\n')
+        line_count = newlines + (0 if ends_with_newline else 1)
+        if line_count <= limit * 2:
+            return mm[:].decode('utf-8')
+        # Locate the head and tail boundaries exactly like `truncate_content`, but on the mapped bytes.
+        head_end = -1
+        for _ in range(limit):
+            head_end = mm.find(b'\n', head_end + 1)
+        tail_end = size - 1 if ends_with_newline else size
+        tail_start = tail_end
+        for _ in range(limit):
+            tail_start = mm.rfind(b'\n', 0, tail_start)
+        print(f"Truncating {line_count - (limit * 2)} lines from file {entry.name}")
+        head = mm[:max(head_end, 0)].decode('utf-8')
+        tail = mm[tail_start + 1:tail_end].decode('utf-8')
     return f"{head}\n\n... [content truncated] ...\n\n{tail}"
 
 def summarize_package_json(content):
@@ -290,6 +820,8 @@ def summarize_package_json(content):
         str: A JSON string containing a summary of the `package.json` (name, version, scripts, dependencies, devDependencies).
              Returns "[Could not parse package.json]" if the content is not valid JSON.
     """
+    # Imported here rather than at the top: only runs that summarize a package.json pay for loading `json`.
+    import json
     try:
         data = json.loads(content) # Parse the JSON content into a Python dictionary.
         # Extract specific keys if they exist in the parsed data.
@@ -299,127 +831,434 @@ def summarize_package_json(content):
         # Handle cases where the file content is not valid JSON.
         return "[Could not parse package.json]"
 
-def generate_tree_summary(root_path, output_file, depth, exclude_patterns, no_gitignore, omit_file_sizes):
+def default_cache_path():
     """
-    Generates only the file tree summary (directory and file names) and writes it to the output file.
+    Returns the path of the content cache used by `--cache`, following the XDG base directory convention.
+
+    Returns:
+        str: `$XDG_CACHE_HOME/file-tree-generator/contents.sqlite`, with `~/.cache` as the default cache home.
     """
-    root = Path(root_path).resolve()
-    all_exclude = DEFAULT_EXCLUDES + exclude_patterns
-    gitignore_cache = {}
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'file-tree-generator', 'contents.sqlite')
 
-   
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"# File Tree Summary for {root.name}\n\n")
-        f.write(f"```tree\n")
-        f.write(f"{TREE_CHARS['dir']} {root.name}/\n")
-
-        def walk_dir(current_path, prefix="", current_depth=0, parent_patterns=None):
-            if current_depth >= depth: return
-
-            gitignore_patterns = list(parent_patterns) if parent_patterns else []
-            if not no_gitignore:
-                gitignore_file = current_path / '.gitignore'
-                if str(gitignore_file) not in gitignore_cache:
-                    gitignore_cache[str(gitignore_file)] = parse_gitignore(gitignore_file)
-                new_patterns = gitignore_cache[str(gitignore_file)]
-                gitignore_patterns.extend([(p, current_path) for p in new_patterns])
+def open_content_cache(path):
+    """
+    Opens (creating it if needed) the SQLite database that caches file contents between runs.
 
-            try:
-                entries = sorted([p for p in current_path.iterdir()], key=lambda p: (p.is_file(), p.name.lower()))
-                filtered_entries = [e for e in entries if not should_exclude(e, all_exclude, gitignore_patterns)]
-            except (PermissionError, FileNotFoundError) as e:
-                logging.warning(f"Could not access {current_path}: {e}")
-                return
-
-            for i, entry in enumerate(filtered_entries):
-                is_last = i == len(filtered_entries) - 1
-                connector = TREE_CHARS["corner"] if is_last else TREE_CHARS["tee"]
-                
-                if entry.is_dir():
-                    f.write(f"{prefix}{connector}{TREE_CHARS['dir']} {entry.name}/\n")
-                    new_prefix = prefix + (TREE_CHARS["space"] if is_last else TREE_CHARS["branch"])
-                    walk_dir(entry, new_prefix, current_depth + 1, gitignore_patterns)
-                else:
-                    try:
-                        file_stat = entry.stat()
-                        size_str = f" [{get_display_size(file_stat.st_size)}]" if not omit_file_sizes else ""
-                        f.write(f"{prefix}{connector}{TREE_CHARS['file']} {entry.name}{size_str}\n")
-                    except OSError as e:
-                        logging.warning(f"Could not get stats for {entry}: {e}")
-        walk_dir(root)
+    Each file is stored once under its device and inode number, together with the size and modification time
+    it had when it was read; a file that changed since simply replaces its row on the next run. Rows also record
+    when they were last used, so `close_content_cache` can evict those of deleted files and trees no longer scanned.
+    The cache is an optimization only, so a database that cannot be opened is reported and the run continues without it.
+
+    Args:
+        path (str): The path of the database file.
+
+    Returns:
+        ContentCache or None: The open database, or None if it could not be opened.
+    """
+    # Imported here rather than at the top: only runs with `--cache` pay for loading `sqlite3`.
+    import sqlite3
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = sqlite3.connect(path)
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != CACHE_SCHEMA_VERSION:
+                with connection:
+                    connection.execute("DROP TABLE IF EXISTS contents")
+                    connection.execute("CREATE TABLE contents (dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, "
+                                       "last_used INTEGER, content TEXT, PRIMARY KEY (dev, ino))")
+                    connection.execute("CREATE INDEX contents_last_used ON contents (last_used)")
+                    connection.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+        except sqlite3.Error:
+            connection.close()
+            raise
+    except (OSError, sqlite3.Error) as e:
+        logging.warning("Could not open the content cache %s: %s", path, e)
+        return None
+    return ContentCache(connection, sqlite3.Error)
 
-        f.write("```\n")  # Close the code block for the tree summary.
+def load_cached_content(cache, file_stat):
+    """
+    Looks up the content of a file in the content cache.
+
+    Args:
+        cache (ContentCache): The content cache (see `open_content_cache`).
+        file_stat (os.stat_result): The stat result of the file.
 
-def generate_detailed_content(root_path, output_file, depth, exclude_patterns, no_gitignore,
-                              use_smart_truncate, truncate_limit, max_file_size):
+    Returns:
+        tuple: A `(hit, content)` tuple. On a hit, `content` is what `read_file_text` returned for the
+               unchanged file, which is None for a binary file.
     """
-    Generates the detailed file content view (Markdown format) and appends it to the output file.
+    # Without an inode number (e.g., `DirEntry.stat()` on Windows) a file cannot be identified, so it is never cached.
+    if not file_stat.st_ino: return False, None
+    try:
+        row = cache.connection.execute("SELECT size, mtime_ns, last_used, content FROM contents WHERE dev = ? AND ino = ?",
+                            (file_stat.st_dev, file_stat.st_ino)).fetchone()
+        if row is None or row[0] != file_stat.st_size or row[1] != file_stat.st_mtime_ns:
+            return False, None
+        now = int(time.time())
+        if now - row[2] >= CACHE_TOUCH_INTERVAL:
+            cache.connection.execute("UPDATE contents SET last_used = ? WHERE dev = ? AND ino = ?", (now, file_stat.st_dev, file_stat.st_ino))
+    except cache.error as e:
+        logging.debug("Content cache lookup failed: %s", e)
+        return False, None
+    return True, row[3]
+
+def store_cached_content(cache, file_stat, content):
     """
-    root = Path(root_path).resolve()
-    all_exclude = DEFAULT_EXCLUDES + exclude_patterns
-    gitignore_cache = {}
+    Stores the content of a file in the content cache, replacing any earlier version of the same file.
 
-    with open(output_file, 'a', encoding='utf-8') as f:
-        def walk_dir_for_content(current_path, current_depth=0, parent_patterns=None):
-            if current_depth >= depth: return
+    Args:
+        cache (ContentCache): The content cache (see `open_content_cache`).
+        file_stat (os.stat_result): The stat result the file had when it was read.
+        content (str or None): The result of `read_file_text` for the file.
+    """
+    if not file_stat.st_ino: return
+    try:
+        cache.connection.execute("INSERT OR REPLACE INTO contents VALUES (?, ?, ?, ?, ?, ?)",
+                      (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, int(time.time()), content))
+    except cache.error as e:
+        logging.debug("Content cache update failed: %s", e)
 
-            gitignore_patterns = list(parent_patterns) if parent_patterns else []
-            if not no_gitignore:
-                gitignore_file = current_path / '.gitignore'
-                if str(gitignore_file) not in gitignore_cache:
-                    gitignore_cache[str(gitignore_file)] = parse_gitignore(gitignore_file)
-                new_patterns = gitignore_cache[str(gitignore_file)]
-                gitignore_patterns.extend([(p, current_path) for p in new_patterns])
+def close_content_cache(cache):
+    """
+    Evicts the rows no run has used for `CACHE_MAX_AGE`, commits the run's changes and closes the content cache.
 
+    Args:
+        cache (ContentCache): The content cache (see `open_content_cache`).
+    """
+    try:
+        cache.connection.execute("DELETE FROM contents WHERE last_used < ?", (int(time.time()) - CACHE_MAX_AGE,))
+        cache.connection.commit()
+    except cache.error as e:
+        logging.warning("Could not update the content cache: %s", e)
+    finally:
+        cache.connection.close()
+
+def scan_directory(directory, parent_patterns, exclude_matcher, no_gitignore, stat_files=True):
+    """
+    Lists a single directory for `scan_tree`: loads its `.gitignore`, filters and sorts its entries and stats its files.
+
+    This is the I/O-bound part of the walk, so `scan_tree` runs it on a thread pool;
+    `os.scandir`, `stat` and the `.gitignore` reads all release the GIL.
+
+    Args:
+        directory (Path): The `pathlib.Path` object of the directory to list.
+        parent_patterns (tuple): The `(GitignoreRules, str)` pairs that apply to the directory's parent.
+        exclude_matcher (callable): The compiled default and user-specified excludes (see `compile_excludes`).
+        no_gitignore (bool): If True, `.gitignore` files are not consulted.
+        stat_files (bool): If False, files are not stat'ed and their stat result is None.
+
+    Returns:
+        tuple: A `(gitignore_patterns, listing)` tuple, where `gitignore_patterns` applies to the directory's children
+               and `listing` holds an `(entry, is_dir, stat, error)` tuple per included entry. The listing is empty
+               if the directory's contents are pruned or cannot be accessed.
+    """
+    if parent_patterns and is_pruned(directory, parent_patterns): return parent_patterns, []
+
+    # The chain of applicable .gitignore rules is an immutable tuple that each directory inherits from its parent:
+    # a directory without its own (non-empty) .gitignore shares the parent's chain object instead of copying it,
+    # and one with a .gitignore extends it by a single link. Each file is parsed only once (see `load_gitignore`).
+    gitignore_patterns = parent_patterns
+    if not no_gitignore:
+        matchers = load_gitignore(directory)
+        if matchers:
+            # The directory is kept as a string with a trailing separator, ready for `relative_key`.
+            gitignore_patterns = parent_patterns + ((matchers, os.path.join(directory, '')),)
+
+    try:
+        filtered_entries = list_entries(directory, exclude_matcher, gitignore_patterns)
+    except OSError as e:
+        # Any unreadable directory (permissions, vanished, symlink loop, ...) is skipped where it is found.
+        logging.warning("Could not access %s: %s", directory, e)
+        return gitignore_patterns, []
+
+    listing = []
+    add = listing.append
+    for entry in filtered_entries:
+        if entry.is_dir():
+            add((entry, True, None, None))
+        elif not stat_files:
+            # The file type already came from the directory read; without sizes or content nothing else is needed.
+            add((entry, False, None, None))
+        else:
             try:
-                entries = sorted([p for p in current_path.iterdir()], key=lambda p: (p.is_file(), p.name.lower()))
-                filtered_entries = [e for e in entries if not should_exclude(e, all_exclude, gitignore_patterns)]
-            except (PermissionError, FileNotFoundError) as e:
-                logging.warning(f"Could not access {current_path}: {e}")
-                return
-
-            for entry in filtered_entries:
-                if entry.is_dir():
-                    walk_dir_for_content(entry, current_depth + 1, gitignore_patterns)
-                else:
-                    try:
-                        file_stat = entry.stat()
-                        relative_path = entry.relative_to(root)
-                        f.write(f"\n--- START OF FILE {relative_path} ---\n")
-
-                        if file_stat.st_size > max_file_size:
-                            f.write(f"[File content omitted, size > {get_display_size(max_file_size)}]\n\n")
-                        elif entry.suffix in BINARY_EXTENSIONS:
-                            f.write(f"[Binary/SVG content omitted]\n\n")
-                        elif use_smart_truncate and entry.name in LOCK_FILES:
-                            f.write(f"[Lock file content omitted for brevity]\n\n")
-                        else:
-                            try:
-                                content = entry.read_text('utf-8')
-                                content_to_write = content
-                                
-                                if use_smart_truncate:
-                                    if entry.name == 'package.json':
-                                        content_to_write = summarize_package_json(content)
-                                    else:
-                                        content_to_write = truncate_content(content, truncate_limit, entry)
-                                
-                                # Determine the language for syntax highlighting
-                                language = LANGUAGE_MAP.get(entry.suffix.lower(), '')
-                                f.write(f"```{language}\n")
-                                try:
-                                    f.write(content_to_write)
-                                    f.write("\n```\n") 
-                                    f.write(f"--- END OF FILE {relative_path} ---\n")
-                                except UnicodeEncodeError:
-                                    f.write(f"[Content contains characters that cannot be encoded to UTF-8]\n\n")
-                            except UnicodeDecodeError:
-                                f.write(f"[Cannot decode file content]\n\n")
-                            except Exception as e:
-                                f.write(f"[Error reading file: {e}]\n\n")
-                    except OSError as e:
-                        f.write(f"### {entry.relative_to(root)} [Stat Error]\n\n")
-        walk_dir_for_content(root)
+                add((entry, False, entry.stat(), None))
+            except OSError as e:
+                add((entry, False, None, e))
+    return gitignore_patterns, listing
+
+def scan_tree(root, depth, exclude_matcher, no_gitignore, jobs=DEFAULT_JOBS, stat_files=True):
+    """
+    Walks the directory tree once and collects everything the summary and the content views need.
+
+    Both views list the same entries in the same order, so a single traversal (one `os.scandir`,
+    one sort and one `stat` per entry) serves them both.
+    The directories themselves are listed on a thread pool: as soon as a directory's listing is known,
+    all of its subdirectories are submitted, so they are scanned in parallel while the depth-first
+    walk below assembles the nodes in their deterministic order.
+
+    Args:
+        root (Path): The resolved `pathlib.Path` object of the root directory.
+        depth (int): The maximum directory depth to traverse. The limit is checked before a directory is
+                     submitted for listing, so nothing beyond it is ever scanned, stat'ed or matched against excludes.
+        exclude_matcher (callable): The compiled default and user-specified excludes (see `compile_excludes`).
+        no_gitignore (bool): If True, `.gitignore` files are not consulted.
+        jobs (int): The number of threads listing directories in parallel.
+        stat_files (bool): If False, files are not stat'ed (for a summary without sizes).
+
+    Returns:
+        list: The `TreeNode` tuples of all included entries, in depth-first, directories-first order.
+    """
+    nodes = []
+    # A depth of 0 lists nothing, not even the root, so neither the thread pool nor a single `scandir` is needed.
+    if depth <= 0: return nodes
+    # Bind the tree characters to locals once instead of indexing the `TREE_CHARS` dict for every directory.
+    tee, corner, branch, space = (TREE_CHARS[k] for k in ('tee', 'corner', 'branch', 'space'))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        def open_level(scanned, prefix, current_depth):
+            gitignore_patterns, listing = scanned
+            # Submit every subdirectory up front, so siblings are listed while the first one is being walked.
+            # Subdirectories at the depth limit are only shown as entries: they are never submitted, so they are not listed.
+            pending = None
+            if current_depth + 1 < depth:
+                pending = [executor.submit(scan_directory, Path(entry.path), gitignore_patterns, exclude_matcher, no_gitignore, stat_files)
+                           if is_dir else None for entry, is_dir, _, _ in listing]
+            # The line prefixes only depend on the level, so they are built once per directory and shared by its entries.
+            return (enumerate(listing), len(listing) - 1, pending, current_depth,
+                    prefix + tee, prefix + corner, prefix + branch, prefix + space)
+
+        # An explicit stack of partially consumed directory listings replaces recursion,
+        # so deep trees cost no Python frame per level and cannot hit the recursion limit.
+        stack = [open_level(scan_directory(root, (), exclude_matcher, no_gitignore, stat_files), "", 0)]
+        add_node = nodes.append
+        while stack:
+            items, last, pending, current_depth, tee_prefix, corner_prefix, branch_prefix, space_prefix = stack[-1]
+            for i, (entry, is_dir, file_stat, error) in items:
+                is_last = i == last
+                add_node(TreeNode(corner_prefix if is_last else tee_prefix, entry, is_dir, file_stat, error))
+
+                if is_dir and pending is not None:
+                    # Descend; this level's iterator resumes after the subdirectory is done.
+                    stack.append(open_level(pending[i].result(), space_prefix if is_last else branch_prefix, current_depth + 1))
+                    break
+            else:
+                stack.pop()
+    return nodes
+
+def write_tree_summary(f, root, nodes, omit_file_sizes):
+    """
+    Writes the file tree summary (directory and file names) to the output file.
+    """
+    f.write(f"# File Tree Summary for {root.name}\n\n")
+    f.write(f"```tree\n")
+    f.write(f"{TREE_CHARS['dir']} {root.name}/\n")
+
+    # Plain concatenation with the precomputed markers is cheaper than formatting each line.
+    # This is the per-entry hot loop, so the nodes are unpacked in the loop header and `append` is
+    # bound once, instead of paying a namedtuple attribute or method lookup on every access.
+    # Lines are collected and handed to the writer in batches, rather than one `write` call per entry.
+    dir_mark, file_mark = TREE_CHARS['dir'] + ' ', TREE_CHARS['file'] + ' '
+    batch = []
+    append = batch.append
+    for prefix, entry, is_dir, file_stat, error in nodes:
+        if is_dir:
+            append(prefix + dir_mark + entry.name + '/\n')
+        elif error:
+            logging.warning("Could not get stats for %s: %s", entry.path, error)
+        elif omit_file_sizes:
+            append(prefix + file_mark + entry.name + '\n')
+        else:
+            append(f"{prefix}{file_mark}{entry.name} [{get_display_size(file_stat.st_size)}]\n")
+        if len(batch) >= SUMMARY_BATCH_SIZE:
+            f.write(''.join(batch))
+            batch.clear()
+
+    f.write(''.join(batch))
+    f.write("```\n")  # Close the code block for the tree summary.
+
+def write_detailed_content(f, root, nodes, use_smart_truncate, truncate_limit, max_file_size, jobs=DEFAULT_JOBS,
+                           content_cache=None):
+    """
+    Writes the detailed file content view (Markdown format) to the output file.
+
+    Files that are read in full are read ahead on a thread pool (up to `READ_AHEAD` files beyond the one
+    being written), so their reads overlap with each other and with writing the output, while the blocks
+    are still written strictly in tree order.
+    With a content cache, unchanged files are taken from the cache instead of being read, and the files that
+    had to be read are added to it. The cache is only ever used from this (the main) thread.
+    """
+    # Module-level lookup tables are bound to locals once, since they are consulted for every file.
+    binary_extensions, lock_files, language_map = BINARY_EXTENSIONS, LOCK_FILES, LANGUAGE_MAP
+    files = [node for node in nodes if not node.is_dir]
+
+    def reads_whole_file(entry, file_stat, error):
+        # Mirrors the branches below: only files that end up in `read_file_text` are worth reading ahead.
+        if error or file_stat.st_size > max_file_size: return False
+        if os.path.splitext(entry.name)[1] in binary_extensions: return False
+        if use_smart_truncate and entry.name != 'package.json':
+            return entry.name not in lock_files and file_stat.st_size < MMAP_MIN_SIZE
+        return True
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = {}
+        uncached = set() # Indexes of the files read from disk that should be added to the content cache.
+        next_to_submit = 0
+        for index, (_, entry, _, file_stat, error) in enumerate(files):
+            # Keep the read-ahead window full.
+            while next_to_submit < min(index + READ_AHEAD, len(files)):
+                _, ahead, _, ahead_stat, ahead_error = files[next_to_submit]
+                if reads_whole_file(ahead, ahead_stat, ahead_error):
+                    hit = False
+                    if content_cache is not None:
+                        hit, content = load_cached_content(content_cache, ahead_stat)
+                    if hit:
+                        # A completed future, so cached and freshly read files take the same path below.
+                        pending[next_to_submit] = Future()
+                        pending[next_to_submit].set_result(content)
+                    else:
+                        pending[next_to_submit] = executor.submit(read_file_text, Path(ahead.path), max_file_size, ahead_stat.st_size)
+                        if content_cache is not None: uncached.add(next_to_submit)
+                next_to_submit += 1
+            read_ahead = pending.pop(index, None)
+            write_file_block(f, root, entry, file_stat, error, read_ahead,
+                             use_smart_truncate, truncate_limit, max_file_size, binary_extensions, lock_files, language_map)
+            # Files that could not be read or decoded are not cached, so they are retried (and reported) every run.
+            if index in uncached and read_ahead.exception() is None:
+                store_cached_content(content_cache, file_stat, read_ahead.result())
+
+def write_file_block(f, root, entry, file_stat, error, read_ahead, use_smart_truncate, truncate_limit, max_file_size,
+                     binary_extensions, lock_files, language_map):
+    """
+    Writes the START/content/END block of a single file of the detailed content view.
+
+    Args:
+        f (file): The output file.
+        root (Path): The resolved root directory, which the file's path is shown relative to.
+        entry (os.DirEntry): The directory entry of the file.
+        file_stat (os.stat_result or None): The stat result of the file, or None if `error` is set.
+        error (OSError or None): The error raised when the file was stat'ed, if any.
+        read_ahead (Future or None): The pending `read_file_text` result for this file, if it was read ahead.
+        use_smart_truncate (bool): If True, long files are truncated and lock files/package.json summarized.
+        truncate_limit (int): The number of lines kept from the head and tail of a truncated file.
+        max_file_size (int): Files larger than this many bytes have their content omitted.
+        binary_extensions (frozenset): The extensions whose content is omitted (`BINARY_EXTENSIONS`).
+        lock_files (frozenset): The lock file names omitted under smart truncation (`LOCK_FILES`).
+        language_map (dict): The code fence language per extension (`LANGUAGE_MAP`).
+    """
+    entry_path = Path(entry.path) # Only files whose content is written need a full `Path`.
+    suffix = entry_path.suffix
+    relative_path = entry_path.relative_to(root)
+    if error:
+        f.write(f"### {relative_path} [Stat Error]\n\n")
+        return
+
+    # Each file block is assembled first and written with a single call.
+    header = f"\n--- START OF FILE {relative_path} ---\n"
+    if file_stat.st_size > max_file_size:
+        f.write(f"{header}[File content omitted, size > {get_display_size(max_file_size)}]\n\n")
+    elif suffix in binary_extensions:
+        f.write(f"{header}[Binary/SVG content omitted]\n\n")
+    elif use_smart_truncate and entry.name in lock_files:
+        f.write(f"{header}[Lock file content omitted for brevity]\n\n")
+    else:
+        try:
+            content_to_write = None
+            # Large files only need their head and tail when truncated, so they are mapped instead of read.
+            if use_smart_truncate and entry.name != 'package.json' and file_stat.st_size >= MMAP_MIN_SIZE:
+                content_to_write = truncate_mapped_file(entry_path, truncate_limit, entry)
+
+            if content_to_write is None:
+                content = read_ahead.result() if read_ahead is not None else read_file_text(entry_path, max_file_size, file_stat.st_size)
+                if content is None:
+                    f.write(f"{header}[Binary content omitted]\n\n")
+                    return
+                content_to_write = content
+            
+                if use_smart_truncate:
+                    if entry.name == 'package.json':
+                        content_to_write = summarize_package_json(content)
+                    else:
+                        content_to_write = truncate_content(content, truncate_limit, entry)
+        except UnicodeDecodeError:
+            f.write(f"{header}[Cannot decode file content]\n\n")
+            return
+        except Exception as e:
+            f.write(f"{header}[Error reading file: {e}]\n\n")
+            return
+
+        # Determine the language for syntax highlighting
+        language = language_map.get(suffix.lower(), '')
+        header += f"```{language}\n"
+        footer = f"\n```\n--- END OF FILE {relative_path} ---\n"
+        try:
+            # The content goes into the fence verbatim, so it is handed to the buffered writer as is:
+            # concatenating it with the header and footer would copy the whole file once more.
+            f.writelines((header, content_to_write, footer))
+        except UnicodeEncodeError:
+            # The header was written; the content is encoded as a whole, so none of it was.
+            f.write("[Content contains characters that cannot be encoded to UTF-8]\n\n")
+
+def generate_tree(root_path, output_file, output_mode, depth, exclude_matcher, no_gitignore,
+                  omit_file_sizes, use_smart_truncate, truncate_limit, max_file_size, jobs=DEFAULT_JOBS, content_cache=None):
+    """
+    Generates the requested views of a directory tree from a single traversal and writes them to the output file.
+
+    The tree is walked once by `scan_tree`; the summary is rendered from the collected nodes first, and the
+    file contents are then streamed after it. A new output is written to a temporary file next to the target and moved
+    into place with `os.replace` once complete, so a crash never leaves a half-written file behind. The content-only view appends to the
+    existing file, as before, so it has to write to it directly.
+
+    Args:
+        root_path (str): The root directory to generate the tree for.
+        output_file (str): The path of the Markdown output file.
+        output_mode (OutputMode): The views to generate.
+        depth (int): The maximum directory depth to traverse.
+        exclude_matcher (callable): The compiled default and user-specified excludes (see `compile_excludes`).
+        no_gitignore (bool): If True, `.gitignore` files are not consulted.
+        omit_file_sizes (bool): If True, file sizes are left out of the summary.
+        use_smart_truncate (bool): If True, long files are truncated and lock files/package.json summarized.
+        truncate_limit (int): The number of lines kept from the head and tail of a truncated file.
+        max_file_size (int): Files larger than this many bytes have their content omitted.
+        jobs (int): The number of threads listing directories and reading file contents in parallel.
+        content_cache (ContentCache or None): The cache of file contents from earlier runs (see `open_content_cache`).
+    """
+    root = Path(root_path).resolve()
+    # Only file sizes in the summary and the content view (size limit) need a stat of every file.
+    stat_files = OutputMode.CONTENT in output_mode or not omit_file_sizes
+    nodes = scan_tree(root, depth, exclude_matcher, no_gitignore, jobs, stat_files)
+
+    emit_summary = OutputMode.SUMMARY in output_mode
+    if emit_summary:
+        # A uniquely named temporary file in the target's directory, so `os.replace` stays a same-filesystem rename
+        # and concurrent runs writing the same output cannot clobber each other's partial file.
+        f = tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', buffering=OUTPUT_BUFFER_SIZE, delete=False,
+                                        dir=os.path.dirname(os.path.abspath(output_file)),
+                                        prefix=f".{os.path.basename(output_file)}.", suffix='.tmp')
+    else:
+        f = open(output_file, 'a', encoding='utf-8', newline='\n', buffering=OUTPUT_BUFFER_SIZE)
+    try:
+        with f:
+            if emit_summary:
+                logging.info("Generating summary view...")
+                write_tree_summary(f, root, nodes, omit_file_sizes)
+            if OutputMode.CONTENT in output_mode:
+                if emit_summary:
+                    f.write("\n\n# DETAILED VIEW WITH FILE CONTENTS\n")
+                logging.info("Generating detailed view with content...")
+                write_detailed_content(f, root, nodes, use_smart_truncate, truncate_limit, max_file_size, jobs, content_cache)
+        if emit_summary:
+            # Temporary files are created private (0600); give the output the permissions a plain `open` would have.
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(f.name, 0o666 & ~umask)
+            os.replace(f.name, output_file)
+    except BaseException:
+        # Remove the partial temporary file, but leave an existing output untouched.
+        if emit_summary and os.path.exists(f.name):
+            os.remove(f.name)
+        raise
 
 def main():
     """
@@ -434,8 +1273,18 @@ def main():
 
     # Validate that the provided folder_path is indeed a directory.
     if not Path(args.folder_path).is_dir():
-        logging.error(f"Error: Path '{args.folder_path}' is not a valid directory.")
+        logging.error("Error: Path '%s' is not a valid directory.", args.folder_path)
         sys.exit(1) # Exit the script with an error code.
+    if args.jobs < 1:
+        logging.error("Error: --jobs must be at least 1, got %s.", args.jobs)
+        sys.exit(1)
+
+    # Compile the default and user-provided excludes once; the walker only ever calls the resulting matcher.
+    try:
+        exclude_matcher = compile_excludes(args.exclude)
+    except re.error as e:
+        logging.error("Error: Invalid --exclude pattern: %s", e)
+        sys.exit(1)
 
     # Determine effective flags based on user arguments and default behaviors.
     omit_file_sizes = not args.include_file_sizes # True if --include-file-sizes was NOT used (default is to omit).
@@ -443,74 +1292,59 @@ def main():
 
     # Determine content display logic based on user arguments.
     # By default, both summary and content views are enabled.
-    show_summary_view = True
-    show_content_view = True
+    output_mode = OutputMode.SUMMARY | OutputMode.CONTENT
 
     # If --only-summary is used, disable the content view.
     if args.only_summary:
-        show_content_view = False
+        output_mode = OutputMode.SUMMARY
     # If --only-content is used, disable the summary view.
     elif args.only_content:
-        show_summary_view = False
+        output_mode = OutputMode.CONTENT
 
     # Log initial information about the tree generation process.
-    logging.info(f"Generating file tree for '{args.folder_path}' (depth: {args.depth})...")
+    logging.info("Generating file tree for '%s' (depth: %s)...", args.folder_path, args.depth)
     if use_smart_truncate:
-        logging.info(f"Smart truncation enabled (limit: {args.truncate_limit} lines).")
+        logging.info("Smart truncation enabled (limit: %s lines).", args.truncate_limit)
     else:
-        logging.info(f"Full file contents included (max size: {get_display_size(args.max_file_size)}).")
+        logging.info("Full file contents included (max size: %s).", get_display_size(args.max_file_size))
     if omit_file_sizes:
         logging.info("File sizes omitted.")
     else:
         logging.info("File sizes included.")
 
-    try:
-        if show_summary_view:
-            logging.info("Generating summary view...")
-            generate_tree_summary(
-                root_path=args.folder_path,
-                output_file=args.output,
-                depth=args.depth,
-                exclude_patterns=args.exclude,
-                no_gitignore=args.no_gitignore,
-                omit_file_sizes=omit_file_sizes
-            )
-           
-            if show_content_view:
-                with open(args.output, 'a', encoding='utf-8') as f:
-                    f.write("\n\n# DETAILED VIEW WITH FILE CONTENTS\n")
+    # The content cache is only consulted by the content view.
+    content_cache = None
+    if args.cache and OutputMode.CONTENT in output_mode:
+        content_cache = open_content_cache(default_cache_path())
 
-                logging.info("Generating detailed view with content...")
-                generate_detailed_content(
-                    root_path=args.folder_path,
-                    output_file=args.output,
-                    depth=args.depth,
-                    exclude_patterns=args.exclude,
-                    no_gitignore=args.no_gitignore,
-                    use_smart_truncate=use_smart_truncate,
-                    truncate_limit=args.truncate_limit,
-                    max_file_size=args.max_file_size
-                )
-        elif show_content_view:
-            logging.info("Generating detailed view with content...")
-            generate_detailed_content(
+    try:
+        if output_mode:
+            generate_tree(
                 root_path=args.folder_path,
                 output_file=args.output,
+                output_mode=output_mode,
                 depth=args.depth,
-                exclude_patterns=args.exclude,
+                exclude_matcher=exclude_matcher,
                 no_gitignore=args.no_gitignore,
+                omit_file_sizes=omit_file_sizes,
                 use_smart_truncate=use_smart_truncate,
                 truncate_limit=args.truncate_limit,
-                max_file_size=args.max_file_size
+                max_file_size=args.max_file_size,
+                jobs=args.jobs,
+                content_cache=content_cache
             )
         else:
             logging.warning("No output mode selected. No tree will be generated.")
 
-        logging.info(f"File tree generation completed successfully. Output saved to '{args.output}'.")
-    except Exception as e:
-        # Catch any unexpected errors during the tree generation process.
-        logging.critical(f"An unexpected error occurred: {e}")
+        logging.info("File tree generation completed successfully. Output saved to '%s'.", args.output)
+    except (OSError, ValueError, KeyboardInterrupt) as e:
+        # Per-entry failures are handled inside the walker; only errors that stop the whole run
+        # (e.g., an unwritable output file) end up here. Anything else is a bug and keeps its traceback.
+        logging.critical("An unexpected error occurred: %s", e)
         sys.exit(1) # Exit the script with an error code.
+    finally:
+        if content_cache is not None:
+            close_content_cache(content_cache)
 
 if __name__ == "__main__":
     # This block ensures that main() is called only when the script is executed directly,